@@ -1,9 +1,12 @@
-# content = open("myProfile.txt")
-# getProfile = content.read()
-# print(goProfile)
+from file_export import write_file
+from mapped_text import find_lines, iter_lines
 
-content = "Hi Dear, This is Kishore"
-f = open(, w)
+# Read the profile a line at a time through a memory map, never loading it whole
+for line in iter_lines("myProfile.txt"):
+    print(line, end="")
 
+# Search the mapped file directly for one record
+print(next(find_lines("myProfile.txt", r"^Profle: "), None))
 
-content.close()
\ No newline at end of file
+content = "Hi Dear, This is Kishore"
+write_file("writeMyfile.txt", content)  # Written to a temporary file, then renamed
\ No newline at end of file
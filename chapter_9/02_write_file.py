@@ -1,15 +1,13 @@
 import os
 
+from file_export import write_files
+
 content = "Hi Dear, This is Kishore Kumar\nThis is my friend \r 6:40 Am - 7% Battery charges"
 
 # Define the directory and file path
 directory = "chapter_9/docs"
 file_path = os.path.join(directory, "writeMyfile.txt")
 
-# Check if the directory exists, if not, create it
-if not os.path.exists(directory):
-    os.makedirs(directory)
-
-# Open the file and write content
-with open(file_path, "w") as f:
-    f.write(content)
+# Create the directory if needed and write the file atomically; write_files
+# takes any number of (path, content) pairs, so bulk exports use the same call
+write_files([(file_path, content)])
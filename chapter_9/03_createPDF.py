@@ -1,5 +1,8 @@
 from fpdf import FPDF
 
+from guide_pdf import add_code_block
+from prose import render_prose
+
 # Create a PDF instance
 pdf = FPDF()
 
@@ -176,8 +179,9 @@ print(math.sqrt(16))  # Output: 4.0
 print(math.pi)        # Output: 3.141592653589793
 """
 
-# Add content to the PDF
-pdf.multi_cell(0, 10, content)
+# Add content to the PDF a paragraph at a time; the example code under
+# each "Example:" line is drawn as a highlighted code block
+render_prose(pdf, content, 10, code_renderer=add_code_block)
 
 # Save the PDF to a file
 pdf.output("basic_python_concepts.pdf")
@@ -1,5 +1,7 @@
 from fpdf import FPDF
 
+from guide_pdf import add_code_block
+
 # Create PDF instance
 pdf = FPDF()
 
@@ -16,17 +18,6 @@ pdf.set_fill_color(173, 216, 230)  # Light blue background
 pdf.cell(0, 10, "Complete Python Basics Guide", ln=1, fill=True, align='C')
 pdf.ln(10)
 
-# --- Helper Function for Code Blocks ---
-def add_code_block(pdf, code, indent=4):
-    pdf.set_font("Courier", size=10)
-    pdf.set_text_color(0, 0, 128)  # Dark blue
-    for line in code.split('\n'):
-        pdf.cell(indent)  # Add indentation
-        pdf.multi_cell(0, 5, line)
-    pdf.ln(3)
-    pdf.set_font("Arial", size=12)
-    pdf.set_text_color(0, 0, 0)  # Reset to black
-
 # --- 1. Variables & Data Types ---
 pdf.set_font("Arial", 'B', 12)
 pdf.cell(0, 10, "1. Variables & Data Types", ln=1)
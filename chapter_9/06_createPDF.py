@@ -1,105 +1,4 @@
-from fpdf import FPDF
-
-class VSCodePDF(FPDF):
-    def __init__(self):
-        super().__init__()
-        # VS Code color scheme
-        self.colors = {
-            'background': (40, 44, 52),    # VS Code dark theme bg
-            'text': (212, 212, 212),       # Default text color
-            'keyword': (86, 156, 214),     # Blue for keywords
-            'string': (152, 195, 121),     # Green for strings
-            'comment': (106, 153, 85),     # Gray-green for comments
-            'function': (220, 220, 170),   # Yellow for functions
-            'number': (184, 215, 163),     # Light green for numbers
-            'operator': (197, 134, 192)    # Purple for operators
-        }
-    
-    def add_vscode_codeblock(self, code, lang='python'):
-        self.set_font('Courier', '', 10)
-        self.set_draw_color(*self.colors['background'])
-        self.set_line_width(0.5)
-        
-        # Code block background
-        self.set_fill_color(*self.colors['background'])
-        self.rect(self.x, self.y, 190, 7 * (code.count('\n') + 2), 'DF')
-        
-        # Code content
-        self.set_xy(self.x + 4, self.y + 2)
-        for line in code.split('\n'):
-            self._add_vscode_line(line)
-            self.ln(5)
-        self.ln(3)
-
-    def _add_vscode_line(self, line):
-        original_x = self.x
-        in_string = False
-        string_char = ''
-        buffer = ''
-        color_stack = []
-
-        def flush_buffer():
-            if buffer:
-                self.set_text_color(*current_color)
-                self.cell(self.get_string_width(buffer), 5, buffer)
-                return self.get_x()
-            return original_x
-
-        current_color = self.colors['text']
-        
-        i = 0
-        while i < len(line):
-            char = line[i]
-            
-            # Handle strings
-            if char in ('"', "'") and not in_string:
-                in_string = True
-                string_char = char
-                flush_buffer()
-                buffer = ''
-                current_color = self.colors['string']
-                i += 1
-                continue
-            elif in_string and char == string_char:
-                in_string = False
-                flush_buffer()
-                buffer = ''
-                current_color = self.colors['text']
-                i += 1
-                continue
-            
-            # Handle comments
-            if char == '#' and not in_string:
-                flush_buffer()
-                buffer = line[i:]
-                self.set_text_color(*self.colors['comment'])
-                self.cell(self.get_string_width(buffer), 5, buffer)
-                break
-            
-            # Handle keywords
-            if not in_string:
-                for keyword in ['def', 'class', 'if', 'else', 'elif', 'for', 
-                               'while', 'return', 'import', 'from', 'as', 'try',
-                               'except', 'finally', 'with', 'True', 'False', 'None']:
-                    if line[i:i+len(keyword)] == keyword and \
-                       (i + len(keyword) >= len(line) or not line[i+len(keyword)].isalnum()):
-                        flush_buffer()
-                        self.set_text_color(*self.colors['keyword'])
-                        self.cell(self.get_string_width(keyword), 5, keyword)
-                        i += len(keyword)
-                        buffer = ''
-                        current_color = self.colors['text']
-                        break
-                else:
-                    buffer += char
-                    i += 1
-            else:
-                buffer += char
-                i += 1
-
-        flush_buffer()
-        self.set_x(original_x + 4)
-        self.ln(5)
+from guide_pdf import VSCodePDF
 
 # --- Create PDF with VS Code Styling ---
 pdf = VSCodePDF()
@@ -0,0 +1,195 @@
+"""Benchmarks the PDF generators on synthetic workloads.
+
+Usage: python benchmark.py [--repeat N] [--only NAME] [--update-baseline]
+
+Every workload runs in a fresh process so that caches start cold and peak
+RSS belongs to that workload alone. Results are compared with
+benchmark_baseline.json; a metric that is worse than the baseline by more
+than its tolerance is reported as a regression and the exit status is 1.
+Throughput baselines are machine specific: refresh them with
+--update-baseline when moving to a different machine. Peak RSS is only
+measured where the resource module exists (not on Windows).
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource  # POSIX only
+except ImportError:
+    resource = None
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'benchmark_baseline.json')
+
+# How much worse than the baseline a metric may get before it fails
+TOLERANCES = {
+    'lines_per_sec': 0.30,
+    'pages_per_sec': 0.30,
+    'peak_rss_kib': 0.20,
+    'output_bytes': 0.05,
+}
+HIGHER_IS_BETTER = ('lines_per_sec', 'pages_per_sec')
+
+MIXED_LINES = (
+    'def fibonacci(n: int):',
+    '    a, b = 0, 1',
+    '    for _ in range(n):',
+    '        yield a  # next value',
+    'print(f"{name} is {age} years old")',
+    'class Circle(Shape):',
+    '    def area(self) -> float:',
+    '        return 3.14 * self.radius ** 2',
+    '',
+    'with timed_operation("Data Processing"):',
+)
+KEYWORD_LINE = 'if x: return lambda y: yield from import as with try except finally else elif'
+STRING_LINE = '''print("alpha", 'beta', "gamma delta", 'e', "f" + "g", 'h')  # "not a string"'''
+
+
+def synthetic_code(kind, lines):
+    if kind == 'keyword':
+        return '\n'.join([KEYWORD_LINE] * lines)
+    if kind == 'string':
+        return '\n'.join([STRING_LINE] * lines)
+    return '\n'.join(MIXED_LINES[i % len(MIXED_LINES)] for i in range(lines))
+
+
+def code_renderer(renderer, code):
+    """Draws one code block with the given renderer and returns the pdf."""
+    from fpdf import FPDF
+    from guide_pdf import PythonGuidePDF, VSCodePDF, add_code_block
+
+    if renderer == 'PythonGuidePDF':
+        pdf = PythonGuidePDF()
+        pdf.add_page()
+        pdf.code_block(code)
+    elif renderer == 'VSCodePDF':
+        pdf = VSCodePDF()
+        pdf.add_page()
+        pdf.add_vscode_codeblock(code)
+    else:
+        pdf = FPDF()
+        pdf.add_page()
+        add_code_block(pdf, code)
+    return pdf
+
+
+def guide_renderer(sections):
+    """Renders a guide with the given number of sections."""
+    from guide_model import Code, Guide, Prose, Section, render_guide
+    from guide_pdf import PythonGuidePDF
+
+    guide = Guide('Benchmark', 'Synthetic guide', tuple(
+        Section(f'{number}. Section', (Prose('Some prose about the section. ' * 8),
+                                       Code(synthetic_code('mixed', 12)),
+                                       Code(synthetic_code('mixed', 6))))
+        for number in range(1, sections + 1)))
+    return render_guide(guide, PythonGuidePDF), sections * 18
+
+
+# name -> (renderer, function returning (pdf, code lines))
+WORKLOADS = {}
+for _renderer in ('PythonGuidePDF', 'VSCodePDF', 'add_code_block'):
+    for _kind, _lines in (('mixed', 10000), ('keyword', 5000), ('string', 5000)):
+        WORKLOADS[f'{_renderer}/code_{_kind}_{_lines}'] = (
+            _renderer, lambda r=_renderer, k=_kind, n=_lines: (code_renderer(r, synthetic_code(k, n)), n))
+WORKLOADS['PythonGuidePDF/guide_1000_sections'] = ('PythonGuidePDF', lambda: guide_renderer(1000))
+
+
+def run_workload(name):
+    """Runs one workload in this (fresh) process and returns its metrics."""
+    start = time.perf_counter()
+    pdf, lines = WORKLOADS[name][1]()
+    output = pdf.output(dest='S')
+    seconds = time.perf_counter() - start
+    metrics = {
+        'seconds': seconds,
+        'lines_per_sec': lines / seconds,
+        'pages_per_sec': pdf.page / seconds,
+        'output_bytes': len(output),
+    }
+    if resource:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform == 'darwin':
+            peak //= 1024  # Bytes there, KiB on Linux
+        metrics['peak_rss_kib'] = peak
+    return metrics
+
+
+def measure(name, repeat):
+    """Best result of repeat runs, each in a newly spawned process."""
+    runs = []
+    for _ in range(repeat):
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            runs.append(pool.submit(run_workload, name).result())
+    best = min(runs, key=lambda run: run['seconds'])
+    if resource:
+        best['peak_rss_kib'] = min(run['peak_rss_kib'] for run in runs)
+    return best
+
+
+def compare(results, baseline):
+    regressions = []
+    for name, metrics in results.items():
+        for metric, tolerance in TOLERANCES.items():
+            expected = baseline.get(name, {}).get(metric)
+            if not expected or metric not in metrics:
+                continue
+            change = (metrics[metric] - expected) / expected
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                regressions.append(f"{name}: {metric} {metrics[metric]:.0f} vs baseline "
+                                   f"{expected:.0f} ({change:+.0%} worse)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PDF generators.")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per workload (best is kept)")
+    parser.add_argument('--only', default='', help="run only workloads containing this text")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'workload':44} {'lines/s':>10} {'pages/s':>9} {'RSS KiB':>9} {'bytes':>10}")
+    for name in WORKLOADS:
+        if args.only in name:
+            metrics = results[name] = measure(name, args.repeat)
+            print(f"{name:44} {metrics['lines_per_sec']:10.0f} {metrics['pages_per_sec']:9.1f} "
+                  f"{metrics.get('peak_rss_kib', '-'):>9} {metrics['output_bytes']:10}")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet; run with --update-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f))
+    if regressions:
+        print("\nPERFORMANCE REGRESSIONS:")
+        for regression in regressions:
+            print("  " + regression)
+        sys.exit(1)
+    print("\nNo regressions against the baseline")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""Renders many guide variants in parallel.
+
+Usage: python build_guides.py guides/builds.json [--jobs N] [--out-dir DIR]
+                                                  [--split-chapters] [--cache-dir DIR]
+                                                  [--watch] [--profile DIR]
+                                                  [--optimize LEVEL]
+
+The spec file is a JSON list of builds, for example
+    {"guide": "python_comprehensive_guide.md", "output": "guide-dark.pdf",
+     "theme": "vscode", "code_font_size": 10, "sections": [1, 2]}
+where "guide" is relative to the spec file and "sections" (1-based) is optional.
+Add "stream": true for very long guides to write pages to disk as they are
+finished instead of holding the whole document in memory.
+Add "unicode_fonts": true to embed DejaVu TTF fonts (found in GUIDE_FONT_DIR
+or the system font directories), subset to the characters the guide uses,
+instead of the core Arial and Courier fonts.
+"optimize": "fast", "balanced" or "small" post-processes the output with
+that level (see pdf_optimize.LEVELS); --optimize sets it for every spec, so
+CI can favour build speed and releases file size.
+"line_breaks": "optimal" breaks prose into evenly filled lines (see
+prose.optimal_breaks) instead of filling each line greedily.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+
+from guide_model import layout_sections, load_guide, merge_chapters, render_guide
+from guide_pdf import PythonGuidePDF
+from pdf_optimize import LEVELS
+from themes import THEMES
+from profiling import Profiler
+from section_cache import SectionCache
+
+DEFAULT_OUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               os.pardir, "assets", "docs")
+
+
+def spec_guide(spec):
+    guide = load_guide(spec['guide'])
+    if spec.get('sections'):
+        if min(spec['sections']) < 1:
+            raise ValueError(f"{spec['guide']}: sections are numbered from 1")
+        guide = guide._replace(sections=tuple(guide.sections[number - 1]
+                                              for number in spec['sections']))
+    return guide
+
+
+def make_pdf(spec):
+    pdf = PythonGuidePDF(theme=spec.get('theme', 'light'),
+                         code_font_size=spec.get('code_font_size', 12),
+                         unicode_fonts=spec.get('unicode_fonts', False),
+                         line_breaks=spec.get('line_breaks', 'greedy'))
+    if 'optimize' in spec:
+        pdf.optimize = spec['optimize']
+    return pdf
+
+
+def spec_style(spec):
+    """Everything besides its content that changes how a section looks."""
+    theme = spec.get('theme', 'light')
+    return (theme, sorted(THEMES[theme].items()), spec.get('code_font_size', 12),
+            spec.get('unicode_fonts', False), spec.get('line_breaks', 'greedy'))
+
+
+def output_path(spec, out_dir):
+    return os.path.join(out_dir, spec['output'])
+
+
+def stream_path(spec, out_dir):
+    """Where a "stream": true spec writes its pages as they are finished."""
+    return output_path(spec, out_dir) if spec.get('stream') else None
+
+
+def save(pdf, spec, out_dir, start, reused=''):
+    path = output_path(spec, out_dir)
+    pdf.output(path)
+    return path, time.perf_counter() - start, os.path.getsize(path), reused
+
+
+def build_one(spec, out_dir, cache_dir=None, profile_dir=None):
+    """Renders one spec and returns (output path, seconds, bytes, note)."""
+    start = time.perf_counter()
+    guide = spec_guide(spec)
+    if profile_dir:
+        profiler = Profiler()
+        pdf = render_guide(guide, profiler.factory(partial(make_pdf, spec)),
+                           stream_path(spec, out_dir))
+        result = save(pdf, spec, out_dir, start)
+        base = os.path.join(profile_dir, os.path.splitext(spec['output'])[0])
+        profiler.to_json(base + '.profile.json')
+        profiler.to_chrome_trace(base + '.trace.json')
+        return result
+    if not cache_dir:
+        pdf = render_guide(guide, partial(make_pdf, spec), stream_path(spec, out_dir))
+        return save(pdf, spec, out_dir, start)
+
+    cache = SectionCache(cache_dir)
+    chapters, misses = cached_chapters(spec, guide, cache, render_chapter)
+    return finish_chapters(spec, guide, chapters, misses, cache, out_dir, start)
+
+
+def render_chapter(spec, section):
+    """Lays out one section in a worker and returns its (pages, outline)."""
+    return layout_sections(make_pdf(spec), [section])
+
+
+def timed_chapter(spec, section):
+    """render_chapter, returning ((pages, outline), seconds spent laying out)."""
+    start = time.perf_counter()
+    chapter = render_chapter(spec, section)
+    return chapter, time.perf_counter() - start
+
+
+def collect_chapters(chapters):
+    """Replaces the timed_chapter futures in chapters by their results.
+
+    Returns the seconds the workers spent on those chapters, so a guide's
+    reported time is its own layout work, not however long it waited for
+    the guides submitted before it.
+    """
+    seconds = 0.0
+    for number, chapter in enumerate(chapters):
+        if isinstance(chapter, Future):
+            chapters[number], layout = chapter.result()
+            seconds += layout
+    return seconds
+
+
+def cached_chapters(spec, guide, cache, layout):
+    """Takes every section it can from cache and lays out only the rest.
+
+    Returns (chapters, misses): one (pages, outline) per section, where
+    layout(spec, section) supplies the sections not in cache (directly or
+    as a timed_chapter Future), and misses lists their (index, cache key).
+    """
+    style = spec_style(spec)
+    chapters = []
+    misses = []
+    for section in guide.sections:
+        key = cache.key(section, style)
+        chapter = cache.load(key)
+        if chapter is None:
+            misses.append((len(chapters), key))
+            chapter = layout(spec, section)
+        chapters.append(chapter)
+    return chapters, misses
+
+
+def finish_chapters(spec, guide, chapters, misses, cache, out_dir, start):
+    """Caches the newly laid-out sections and writes the merged guide."""
+    for number, key in misses:
+        cache.save(key, chapters[number])
+    pdf = merge_chapters(guide, chapters, partial(make_pdf, spec), stream_path(spec, out_dir))
+    reused = len(chapters) - len(misses)
+    return save(pdf, spec, out_dir, start, f"{reused}/{len(chapters)} sections reused")
+
+
+def load_specs(spec_file, optimize=None):
+    with open(spec_file, encoding='utf-8') as f:
+        specs = json.load(f)
+    base = os.path.dirname(os.path.abspath(spec_file))
+    for spec in specs:
+        spec['guide'] = os.path.join(base, spec['guide'])
+        if optimize:
+            spec['optimize'] = optimize
+        if spec.get('optimize') is not None and spec['optimize'] not in LEVELS:
+            raise ValueError(f"{spec_file}: unknown optimize level {spec['optimize']!r}, "
+                             f"expected one of {', '.join(sorted(LEVELS))}")
+    return specs
+
+
+def build(specs, out_dir=DEFAULT_OUT_DIR, jobs=None, split_chapters=False,
+          cache_dir=None, profile_dir=None):
+    """Renders every spec across a process pool and prints its timing.
+
+    With split_chapters every section of every guide is laid out as its own
+    task and the guides are stitched together here, which spreads a single
+    very large guide over all cores. With cache_dir the build is
+    incremental: sections whose content and style are unchanged since the
+    last build are reused from there instead of being laid out again.
+    With profile_dir each guide's per-stage timings are written there as
+    <output>.profile.json and a Chrome trace, <output>.trace.json.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        if split_chapters:
+            cache = SectionCache(cache_dir) if cache_dir else None
+            pending = []
+            for spec in specs:
+                guide = spec_guide(spec)
+                if cache:
+                    chapters, misses = cached_chapters(spec, guide, cache,
+                                                       partial(pool.submit, timed_chapter))
+                else:
+                    chapters = [pool.submit(timed_chapter, spec, section)
+                                for section in guide.sections]
+                    misses = None
+                pending.append((spec, guide, chapters, misses))
+            for spec, guide, chapters, misses in pending:
+                # Timed as the workers' layout time plus this guide's own merge
+                guide_start = time.perf_counter() - collect_chapters(chapters)
+                if cache:
+                    results.append(finish_chapters(spec, guide, chapters, misses, cache,
+                                                   out_dir, guide_start))
+                else:
+                    pdf = merge_chapters(guide, chapters, partial(make_pdf, spec),
+                                         stream_path(spec, out_dir))
+                    results.append(save(pdf, spec, out_dir, guide_start))
+        else:
+            futures = [pool.submit(build_one, spec, out_dir, cache_dir, profile_dir)
+                       for spec in specs]
+            results = [future.result() for future in futures]
+
+    for path, seconds, size, note in results:
+        print(f"{os.path.basename(path):40} {seconds * 1000:8.1f} ms {size:10} bytes  {note}")
+    print(f"Built {len(results)} guides in {time.perf_counter() - start:.2f} s")
+    return results
+
+
+def watch(spec_file, out_dir=DEFAULT_OUT_DIR, cache_dir=None, optimize=None, interval=0.2):
+    """Rebuilds guides whenever their content files change, until interrupted.
+
+    Everything runs in this one process, so fpdf, the fonts, the themes and
+    the highlight and section caches stay warm between builds and an edit
+    only re-lays out the sections it touched. Editing the spec file
+    rebuilds every guide it lists. A failed build is reported and tried
+    again when its guide (or the spec file) changes next; it never stops
+    the other guides or the watcher.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    cache = SectionCache(cache_dir)
+    seen = {}
+    specs = []
+    bad_spec = None  # Modification time of a spec file that failed to load
+    print(f"Watching {spec_file} (Ctrl+C to stop)")
+    while True:
+        # Anything can be wrong with a file caught mid-save or a bad edit, and
+        # this process is meant to outlive it: report it and carry on
+        try:
+            spec_mtime = os.stat(spec_file).st_mtime
+            if seen.get(spec_file) != spec_mtime and bad_spec != spec_mtime:
+                bad_spec = spec_mtime  # Report a bad spec file once, not on every poll
+                specs = load_specs(spec_file, optimize)
+                bad_spec = None
+                seen = {spec_file: spec_mtime}  # New specs: rebuild everything
+        except Exception as e:
+            print(f"Build failed: {spec_file}: {e!r}")
+        changed = {}  # Guide file -> modification time it is being rebuilt for
+        for guide_file in {spec['guide'] for spec in specs}:
+            try:
+                mtime = os.stat(guide_file).st_mtime
+            except OSError:
+                continue  # Mid-save or moved away; looked at again on the next poll
+            if seen.get(guide_file) != mtime:
+                changed[guide_file] = mtime
+        for spec in specs:
+            if spec['guide'] in changed:
+                try:
+                    start = time.perf_counter()
+                    guide = spec_guide(spec)
+                    chapters, misses = cached_chapters(spec, guide, cache, render_chapter)
+                    path, seconds, size, note = finish_chapters(spec, guide, chapters, misses,
+                                                                cache, out_dir, start)
+                    print(f"{os.path.basename(path):40} {seconds * 1000:8.1f} ms  {note}")
+                except Exception as e:
+                    print(f"Build failed: {spec.get('output', spec['guide'])}: {e!r}")
+        seen.update(changed)  # Only now, so a guide is never skipped before it was built
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render guide PDFs in parallel.")
+    parser.add_argument('spec_file', help="JSON list of guide build specs")
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="worker processes (default: one per CPU core)")
+    parser.add_argument('--out-dir', default=DEFAULT_OUT_DIR,
+                        help="output directory (default: assets/docs)")
+    parser.add_argument('--split-chapters', action='store_true',
+                        help="lay out each section in its own worker and merge")
+    parser.add_argument('--cache-dir', default=None,
+                        help="rebuild incrementally, keeping laid-out sections here")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep running and rebuild guides when their files change")
+    parser.add_argument('--profile', metavar='DIR', default=None,
+                        help="write per-stage profiles and Chrome traces to DIR")
+    parser.add_argument('--optimize', choices=sorted(LEVELS), default=None,
+                        help="output optimization level for every guide")
+    args = parser.parse_args()
+    if args.profile and (args.split_chapters or args.cache_dir or args.watch):
+        parser.error("--profile only works with plain builds")
+    if args.watch:
+        try:
+            watch(args.spec_file, args.out_dir, args.cache_dir, args.optimize)
+        except KeyboardInterrupt:
+            pass
+    else:
+        try:
+            specs = load_specs(args.spec_file, args.optimize)
+        except ValueError as e:
+            parser.error(str(e))
+        build(specs, args.out_dir, args.jobs, args.split_chapters, args.cache_dir, args.profile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+def wrap_runs(lines, max_chars):
+    """Wraps highlighted lines into the rows they will occupy on the page.
+
+    lines holds one list of (color, text) runs per source line, as returned
+    by HighlightCache.get_runs. Code is set in a monospace font, so a row
+    holds at most max_chars characters; long lines break after the last
+    space that fits (the space is dropped) or mid-word if there is none,
+    like FPDF's own wrapping.
+    """
+    if max_chars < 1:
+        raise ValueError(f'max_chars must be at least 1, not {max_chars}')
+    rows = []
+    for runs in lines:
+        text = ''.join(text for _, text in runs)
+        start = 0
+        while len(text) - start > max_chars:
+            cut = text.rfind(' ', start + 1, start + max_chars + 1)
+            if cut == -1:
+                cut = next_start = start + max_chars
+            else:
+                next_start = cut + 1
+            rows.append(_slice_runs(runs, start, cut))
+            start = next_start
+        rows.append(_slice_runs(runs, start, len(text)) if start else runs)
+    return rows
+
+
+def _slice_runs(runs, start, end):
+    sliced = []
+    pos = 0
+    for color, text in runs:
+        run_end = pos + len(text)
+        if run_end > start and pos < end:
+            sliced.append((color, text[max(start - pos, 0):end - pos]))
+        pos = run_end
+    return sliced
+
+
+def split_rows(row_count, row_height, padding, space_left, page_space):
+    """Decides up front how a code block's rows are spread over pages.
+
+    space_left is the room left on the current page and page_space the
+    room on an empty page; each page's part of the block is padded above
+    and below. Returns (start_on_new_page, chunks) where chunks lists the
+    number of rows drawn on each page. A block that fits on an empty page
+    is kept together; a longer one fills the current page and continues.
+    """
+    def rows_in(space):
+        return max(int((space - 2 * padding) // row_height), 0)
+
+    height = row_count * row_height + 2 * padding
+    if height <= space_left:
+        return False, [row_count]
+    if height <= page_space:
+        return True, [row_count]
+
+    chunks = []
+    remaining = row_count
+    first = rows_in(space_left)
+    if first:
+        chunks.append(first)
+        remaining -= first
+    per_page = max(rows_in(page_space), 1)
+    while remaining > 0:
+        chunks.append(min(per_page, remaining))
+        remaining -= per_page
+    return not first, chunks
+
+
+def page_chunks(rows, first, per_page):
+    """Groups an iterable of rows into one list per page, as they arrive.
+
+    The first page takes up to first rows (at least one), every later
+    page up to per_page. Nothing is read ahead, so only the page being
+    filled is held in memory however long the listing is.
+    """
+    chunk = []
+    limit = first
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == limit:
+            yield chunk
+            chunk = []
+            limit = per_page
+    if chunk:
+        yield chunk
@@ -0,0 +1,107 @@
+import os
+import shutil
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+BUFFER_SIZE = 1 << 20  # Write buffer per file; most exports go out in one system call
+
+
+def write_file(path, content, encoding='utf-8', buffer_size=BUFFER_SIZE, fsync=True):
+    """Writes content to path atomically: to a temporary file, then renamed.
+
+    content is a string, bytes or an iterable of either (e.g. a generator
+    of lines), so a stream is written without being joined first. Text is
+    encoded as is, without newline translation. Readers see the old file
+    or the complete new one, never a half-written one, and a file that is
+    replaced keeps its permission bits. With fsync the data reaches the
+    disk before the rename, so that also holds after a crash; caches that
+    can rebuild a lost entry skip it.
+    """
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        chunks = [content] if isinstance(content, (str, bytes)) else content
+        with open(tmp, 'wb', buffering=buffer_size) as f:
+            for chunk in chunks:
+                f.write(chunk.encode(encoding) if isinstance(chunk, str) else chunk)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_files(items, jobs=None, encoding='utf-8', buffer_size=BUFFER_SIZE, fsync=True):
+    """Writes many (path, content) pairs, each atomically, and returns the count.
+
+    Each directory is created once per call, no matter how many files go
+    into it, and files are written one after another. With jobs > 1 they
+    are written by that many threads instead, which overlaps the opens,
+    writes and renames; that only pays off when the disk makes them wait
+    (network or slow storage), as the thread hand-offs cost more than a
+    write to a local disk's cache. At most a few files per thread are in
+    flight, so items can be a generator of any length. A later pair for
+    the same path wins. In both modes a failed write does not stop the
+    others: the error of the first pair that failed is raised once every
+    file has been tried. fsync is passed on to write_file; syncing every
+    file is most of the cost of small exports, so turn it off for output
+    that can simply be written again.
+    """
+    created = set()
+    count = 0
+    errors = []  # (index of the pair, exception)
+
+    def prepare(path):
+        directory = os.path.dirname(path)
+        if directory and directory not in created:
+            os.makedirs(directory, exist_ok=True)
+            created.add(directory)
+
+    if not jobs or jobs == 1:
+        for path, content in items:
+            try:
+                prepare(path)
+                write_file(path, content, encoding, buffer_size, fsync)
+            except Exception as e:
+                errors.append((count, e))
+            count += 1
+        if errors:
+            raise min(errors, key=lambda error: error[0])[1]
+        return count
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        limit = jobs * 4
+        pending = {}  # Path -> future; one write per path at a time keeps the order
+        indexes = {}  # Future -> index of its pair
+
+        def collect(futures):
+            for future in futures:
+                if future.exception() is not None:
+                    errors.append((indexes[future], future.exception()))
+
+        for path, content in items:
+            index = count
+            count += 1
+            try:
+                prepare(path)
+            except Exception as e:
+                errors.append((index, e))
+                continue
+            earlier = pending.pop(path, None)
+            if earlier is not None:  # Let the earlier write land first
+                wait([earlier])
+                collect([earlier])
+            if len(pending) >= limit:
+                done, _ = wait(pending.values(), return_when=FIRST_COMPLETED)
+                collect(done)
+                pending = {p: f for p, f in pending.items() if f not in done}
+            pending[path] = pool.submit(write_file, path, content, encoding, buffer_size, fsync)
+            indexes[pending[path]] = index
+        wait(pending.values())
+        collect(pending.values())
+    if errors:
+        raise min(errors, key=lambda error: error[0])[1]
+    return count
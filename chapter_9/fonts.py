@@ -0,0 +1,125 @@
+import os
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# Where unicode TrueType fonts are looked for, in order; GUIDE_FONT_DIR comes first
+FONT_DIRS = [d for d in (os.environ.get('GUIDE_FONT_DIR'),
+                         os.path.join(here, 'fonts'),
+                         '/usr/share/fonts/truetype/dejavu',
+                         '/usr/share/fonts/dejavu',
+                         '/usr/share/fonts/TTF',
+                         '/Library/Fonts',
+                         'C:\\Windows\\Fonts') if d]
+
+# Embedded font families: style -> file name. A style without a file of its
+# own is drawn with the regular face instead of embedding another font.
+UNICODE_FONTS = {
+    'DejaVu': {'': 'DejaVuSans.ttf', 'B': 'DejaVuSans-Bold.ttf', 'I': 'DejaVuSans-Oblique.ttf'},
+    'DejaVuMono': {'': 'DejaVuSansMono.ttf'},
+}
+
+# Font file path -> (font entry, font file entry) parsed by FPDF.add_font,
+# so a batch build reads and measures every TTF file once per process
+_parsed_fonts = {}
+
+
+def find_font(file_name):
+    for directory in FONT_DIRS:
+        path = os.path.join(directory, file_name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class GlyphSubset(list):
+    """The code points drawn with a TTF font, each listed once.
+
+    FPDF appends every character it draws to the font's subset list, so
+    the list grows with the text and every lookup in it is a linear scan.
+    This list ignores characters it already holds and answers 'in' from a
+    set, while still behaving as the list FPDF's subsetter expects.
+    """
+
+    def __init__(self, codes=()):
+        super().__init__()
+        self.seen = set()
+        for code in codes:
+            self.append(code)
+
+    def append(self, code):
+        if code not in self.seen:
+            self.seen.add(code)
+            super().append(code)
+
+    def __contains__(self, code):
+        return code in self.seen
+
+    def __delitem__(self, index):
+        self.seen.discard(self[index])
+        super().__delitem__(index)
+
+
+class EmbeddedFontMixin:
+    """Embeds unicode TTF fonts, subset to the glyphs actually drawn.
+
+    add_embedded_font registers a family/style like FPDF.add_font(uni=True)
+    but reuses font files already parsed in this process, and a style that
+    uses the same file as one already registered becomes an alias of it
+    rather than a second embedded copy. Mix in before FPDF.
+    """
+
+    def add_embedded_font(self, family, style, path):
+        if not hasattr(self, 'embedded_fonts'):
+            self.embedded_fonts = {}  # Font file path -> (family, style)
+            self.font_aliases = {}    # Font key -> (family, style) drawn instead
+        if path in self.embedded_fonts:  # Same file as another style
+            self.font_aliases[family.lower() + style] = self.embedded_fonts[path]
+            return
+        self.embedded_fonts[path] = (family, style)
+        key = family.lower() + style
+        parsed = _parsed_fonts.get(path)
+        if parsed is None:
+            self.add_font(family, style, path, uni=True)
+            _parsed_fonts[path] = (dict(self.fonts[key]), dict(self.font_files[key]))
+        else:
+            font, font_file = parsed
+            self.fonts[key] = dict(font, i=len(self.fonts) + 1, fontkey=key)
+            self.font_files[key] = dict(font_file)
+            self.font_files[path] = {'type': 'TTF'}
+        # Like FPDF, always keep the control characters (and the digits if
+        # the total page count is substituted in later)
+        first = 57 if hasattr(self, 'str_alias_nb_pages') else 32
+        self.fonts[key]['subset'] = GlyphSubset(range(first))
+
+    def add_embedded_family(self, family):
+        """Registers every style of a UNICODE_FONTS family that can be found."""
+        files = UNICODE_FONTS[family]
+        for style, file_name in files.items():
+            path = find_font(file_name)
+            if path is None:
+                if style == '':
+                    raise RuntimeError(f'Font file {file_name} not found in any of: '
+                                       + ', '.join(FONT_DIRS))
+                path = find_font(files[''])  # Drawn with the regular face
+            self.add_embedded_font(family, style, path)
+
+    def set_font(self, family, style='', size=0):
+        style = style.upper()
+        alias = getattr(self, 'font_aliases', {}).get(family.lower() + style.replace('U', ''))
+        if alias:
+            family, real_style = alias
+            style = real_style + ('U' if 'U' in style else '')
+        super().set_font(family, style, size)
+
+    def reserve_glyphs(self, text):
+        """Adds text's characters to every embedded font's subset.
+
+        Needed for pages laid out by another document and appended as
+        finished content, since their characters never pass through this
+        document's cell and write calls.
+        """
+        codes = set(map(ord, text))
+        for font in self.fonts.values():
+            if font['type'] == 'TTF':
+                for code in codes:
+                    font['subset'].append(code)
@@ -0,0 +1,204 @@
+import json
+import os
+from collections import namedtuple
+
+# Guide content as plain tuples: cheap to build, compare, hash and cache
+Guide = namedtuple('Guide', 'title subtitle sections')
+Section = namedtuple('Section', 'title blocks')
+Heading = namedtuple('Heading', 'text')
+Prose = namedtuple('Prose', 'text')
+Code = namedtuple('Code', 'code')
+
+
+def guide_from_dict(data):
+    """Builds a Guide from parsed JSON/YAML data.
+
+    Blocks are one-key dicts: {"prose": ...}, {"heading": ...} or {"code": ...}.
+    """
+    block_types = {'prose': Prose, 'heading': Heading, 'code': Code}
+    sections = []
+    for section in data['sections']:
+        blocks = []
+        for block in section.get('blocks', []):
+            (kind, value), = block.items()
+            blocks.append(block_types[kind](value))
+        sections.append(Section(section['title'], tuple(blocks)))
+    return Guide(data['title'], data.get('subtitle', ''), tuple(sections))
+
+
+def parse_markdown(text):
+    """Parses the small Markdown subset used by the guide files.
+
+    '# ' is the guide title and the paragraph after it the subtitle,
+    '## ' starts a section, '### ' is a sub-heading, fenced blocks are
+    code and every other paragraph is prose. Raises ValueError, with the
+    line number, for a sub-heading or code block outside a section and for
+    a code block that is never closed.
+    """
+    title = ''
+    subtitle = ''
+    sections = []
+    blocks = None
+    paragraph = []
+    code = None
+
+    def end_paragraph():
+        nonlocal subtitle
+        if paragraph:
+            if blocks is None:
+                subtitle = ' '.join(paragraph)
+            else:
+                blocks.append(Prose(' '.join(paragraph)))
+            paragraph.clear()
+
+    for number, line in enumerate(text.split('\n'), 1):
+        if code is not None:
+            if line.startswith('```'):
+                blocks.append(Code('\n'.join(code)))
+                code = None
+            else:
+                code.append(line)
+        elif line.startswith('```'):
+            end_paragraph()
+            if blocks is None:
+                raise ValueError(f'line {number}: code block before the first "## " section')
+            code = []
+            code_start = number
+        elif line.startswith('### '):
+            end_paragraph()
+            if blocks is None:
+                raise ValueError(f'line {number}: "### " heading before the first "## " section')
+            blocks.append(Heading(line[4:].strip()))
+        elif line.startswith('## '):
+            end_paragraph()
+            blocks = []
+            sections.append((line[3:].strip(), blocks))
+        elif line.startswith('# '):
+            end_paragraph()
+            title = line[2:].strip()
+        elif line.strip():
+            paragraph.append(line.strip())
+        else:
+            end_paragraph()
+    if code is not None:
+        raise ValueError(f'line {code_start}: code block is never closed')
+    end_paragraph()
+
+    return Guide(title, subtitle,
+                 tuple(Section(name, tuple(body)) for name, body in sections))
+
+
+def load_guide(path):
+    """Loads a guide from a .md, .json, .yaml or .yml file."""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.md':
+        return parse_markdown(text)
+    if ext == '.json':
+        return guide_from_dict(json.loads(text))
+    if ext in ('.yaml', '.yml'):
+        import yaml  # Optional: only needed for YAML guides
+        return guide_from_dict(yaml.safe_load(text))
+    raise ValueError(f"Unsupported guide format: {path}")
+
+
+def render_front_matter(guide, pdf, entries):
+    """Draws the cover and a table of contents of (title, page) entries."""
+    pdf.add_page()
+    pdf.cover_page(guide.title, guide.subtitle)
+    pdf.table_of_contents(entries)
+
+
+def render_section(pdf, section):
+    """Draws one section, starting on a new page."""
+    pdf.start_section(section.title)
+    for block in section.blocks:
+        if isinstance(block, Code):
+            pdf.code_block(block.code)
+        elif isinstance(block, Heading):
+            pdf.sub_heading(block.text)
+        else:
+            pdf.paragraph(block.text)
+
+
+def layout_sections(pdf, sections, spool=False):
+    """Lays sections out in pdf and returns their (pages, outline).
+
+    pages are the finished page content streams and outline the
+    (title, page, y) of every section header, numbered from page 1.
+    With spool, pages go to a temporary file (a PageSpool) as they finish.
+    """
+    if spool:
+        pages = pdf.spool_pages()
+    for section in sections:
+        render_section(pdf, section)
+    if spool:
+        pdf.finish_pages()
+        return pages, pdf.outline
+    return [pdf.pages[n] for n in range(1, pdf.page + 1)], pdf.outline
+
+
+def render_guide(guide, make_pdf, stream_to=None):
+    """Renders a Guide in two passes and returns the finished pdf.
+
+    The first pass lays out the body once and records where every section
+    header lands; the second draws the cover and table of contents with
+    those page numbers and appends the body pages unchanged. With
+    stream_to, body pages wait in a temporary file and the final pages are
+    written to stream_to as they are finished, so memory use does not
+    grow with the length of the guide; pdf.output() then completes the file.
+    """
+    body = layout_sections(make_pdf(), guide.sections, spool=bool(stream_to))
+    return merge_chapters(guide, [body], make_pdf, stream_to)
+
+
+def guide_text(guide):
+    """Every piece of text in the guide's sections."""
+    parts = []
+    for section in guide.sections:
+        parts.append(section.title)
+        parts.extend(block[0] for block in section.blocks)  # Heading, Prose or Code
+    return ''.join(parts)
+
+
+def merge_chapters(guide, chapters, make_pdf, stream_to=None):
+    """Puts the cover and table of contents in front of laid-out chapters.
+
+    chapters holds (pages, outline) pairs from layout_sections, each
+    numbered from page 1. The table of contents lists every header in the
+    chapter outlines with its final page number, then the chapter pages
+    and bookmarks are appended with their page numbers shifted into place.
+    With stream_to, every page is written to that file as it is appended.
+    """
+    front_pages = 1
+    while True:
+        offsets = []
+        page = front_pages
+        for pages, _ in chapters:
+            offsets.append(page)
+            page += len(pages)
+        entries = [(title, page + offset)
+                   for (_, outline), offset in zip(chapters, offsets)
+                   for title, page, _ in outline]
+        pdf = make_pdf()
+        render_front_matter(guide, pdf, entries)
+        if pdf.page == front_pages:
+            break
+        front_pages = pdf.page  # A long table of contents spilled over; redo it
+
+    if stream_to:
+        # Pages written to a file cannot be taken back, so stream only once the
+        # size of the front matter is known
+        pdf = make_pdf()
+        pdf.stream_to(stream_to)
+        render_front_matter(guide, pdf, entries)
+
+    # The chapter pages were drawn by other documents, so their characters
+    # have to be added to this document's embedded font subsets
+    pdf.reserve_glyphs(guide_text(guide))
+    for (pages, outline), offset in zip(chapters, offsets):
+        pdf.outline.extend((title, page + offset, y) for title, page, y in outline)
+        for content in pages:
+            pdf.append_page(content)
+    return pdf
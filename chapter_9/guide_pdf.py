@@ -0,0 +1,325 @@
+from fpdf import FPDF
+
+from code_layout import page_chunks, split_rows, wrap_runs
+from fonts import EmbeddedFontMixin
+from highlighter import guide_highlighter, highlight_cache, highlight_lines, vscode_highlighter
+from pdf_optimize import OptimizedOutputMixin
+from prose import draw_paragraph
+from source_files import expand_paths, source_cache
+from streaming_pdf import StreamingPDFMixin
+from text_metrics import CachedWidthMixin, fixed_advance
+from themes import apply_text_op, code_block_theme, get_theme
+
+CODE_LINE_HEIGHT = 5  # mm per code row, at least
+CODE_PADDING = 2      # mm of background above and below the code, at least
+CODE_LEADING = 1.15   # Row height per font size, once that is over CODE_LINE_HEIGHT
+LISTING_NUMBER_DIGITS = 5  # Width of the line number gutter in code_listing, at least
+
+# Every font the guide uses, registered up front in this order so that the
+# /F1../F4 font names in page content streams are the same in every document.
+# 'text' and 'code' stand for the text_font and code_font attributes.
+GUIDE_FONTS = (('text', 'B'), ('text', ''), ('text', 'I'), ('code', ''))
+
+
+def code_spacing(font_size):
+    """(row height, padding) in mm for code set in a font_size mm font.
+
+    Up to about 12 pt that is CODE_LINE_HEIGHT and CODE_PADDING; larger
+    fonts get taller rows, and padding in proportion, so rows never overlap.
+    """
+    row = max(CODE_LINE_HEIGHT, font_size * CODE_LEADING)
+    return row, CODE_PADDING * row / CODE_LINE_HEIGHT
+
+class PythonGuidePDF(CachedWidthMixin, EmbeddedFontMixin, StreamingPDFMixin,
+                     OptimizedOutputMixin, FPDF):
+    def __init__(self, theme='light', code_font_size=12, unicode_fonts=False, line_breaks='greedy'):
+        super().__init__()
+        self.theme = get_theme(theme)
+        self.colors = self.theme.colors
+        self.code_font_size = code_font_size
+        self.code_row, self.code_padding = code_spacing(code_font_size / self.k)
+        self.line_breaks = line_breaks  # 'greedy' (like multi_cell) or 'optimal'
+        self.outline = []  # (title, page, y) bookmarks
+        self.set_auto_page_break(auto=True, margin=15)
+        self.set_margins(10, 10, 10)
+        if unicode_fonts:
+            # Embedded TTF fonts, subset to the characters the guide uses
+            self.text_font, self.code_font = 'DejaVu', 'DejaVuMono'
+            self.add_embedded_family(self.text_font)
+            self.add_embedded_family(self.code_font)
+        else:
+            self.text_font, self.code_font = 'Arial', 'Courier'
+        for role, style in GUIDE_FONTS:
+            self.set_font(getattr(self, role + '_font'), style)
+        self.font_family = ''  # Registered only; the first page sets its own font
+        self.current_font = {}
+
+    def cover_page(self, title, subtitle):
+        self.set_font(self.text_font, 'B', 24)
+        self.set_text_color(0, 0, 139)  # Dark blue
+        self.cell(0, 40, title, ln=True, align='C')
+        self.set_font(self.text_font, '', 16)
+        self.set_text_color(0, 0, 0)
+        self.cell(0, 10, subtitle, ln=True, align='C')
+        self.ln(30)
+
+    def table_of_contents(self, entries):
+        self.header_section("Table of Contents")
+        width = self.w - self.l_margin - self.r_margin
+        for title, page in entries:
+            # Dotted leader fills the line up to the right-aligned page number
+            label = f"{title} "
+            number = f" {page}"
+            number_width = self.get_string_width(number)
+            dots = int((width - number_width - self.get_string_width(label))
+                       / self.get_string_width('.'))
+            self.cell(width - number_width, 10, label + '.' * dots)
+            self.cell(number_width, 10, number, ln=True, align='R')
+
+    def start_section(self, title):
+        """Starts a section on a new page, under its header."""
+        self.add_page()
+        self.header_section(title)
+
+    def header_section(self, title):
+        self.outline.append((title, self.page, self.y))
+        self.set_font(self.text_font, 'B', 14)
+        self.set_text_color(0, 0, 139)  # Dark blue
+        self.cell(0, 10, title, ln=True)
+        self.ln(5)
+
+    def sub_heading(self, text):
+        self.set_font(self.text_font, 'I', 11)
+        self.set_text_color(0, 0, 0)
+        self.cell(0, 7, text, ln=True)
+
+    def paragraph(self, text):
+        self.set_font(self.text_font, '', 11)
+        self.set_text_color(0, 0, 0)
+        draw_paragraph(self, text, 6, line_breaks=self.line_breaks)
+        self.ln(3)
+
+    def code_block(self, code):
+        self.set_font(self.code_font, '', self.code_font_size)
+        lines = self._get_runs(code)
+        width = self.w - self.l_margin - self.r_margin
+        # At least one character per row, however large the font
+        rows = wrap_runs(lines, max(int((width - 2 * self.c_margin) / self.get_string_width(' ')), 1))
+
+        # Measure once, then place every page's part of the block with its own background
+        new_page, chunks = split_rows(len(rows), self.code_row, self.code_padding,
+                                      self.page_break_trigger - self.y,
+                                      self.page_break_trigger - self.t_margin)
+        if new_page:
+            self.add_page()
+        self.set_fill_color(*self.colors['highlight'])
+        start = 0
+        for number, count in enumerate(chunks):
+            if number:
+                self.add_page()
+            self.rect(self.l_margin, self.y, width, count * self.code_row + 2 * self.code_padding, 'F')
+            self.set_y(self.y + self.code_padding)
+            self._syntax_highlight(rows[start:start + count])
+            self.set_y(self.y + self.code_padding)
+            start += count
+        self.ln(8)
+
+    def code_listing(self, source, line_numbers=False):
+        """Draws a listing of any length from a file path or an iterable of lines.
+
+        Lines are read, highlighted and wrapped one at a time and drawn a
+        page at a time, each page with its own background, so only one
+        page of rows is in memory. Combine with stream_to or spool_pages to
+        keep the finished pages out of memory too. Files are read through
+        source_cache, which skips files that have not changed.
+        """
+        self.set_font(self.code_font, '', self.code_font_size)
+        if isinstance(source, str):
+            lines = source_cache.get_runs(source, guide_highlighter, self.theme.text_ops)
+        else:
+            lines = highlight_lines(source, guide_highlighter, self.theme.text_ops)
+        width = self.w - self.l_margin - self.r_margin
+        char_width = self.get_string_width(' ')
+        rows = self._listing_rows(lines, width, char_width, line_numbers)
+
+        def rows_in(space):
+            return int((space - 2 * self.code_padding) // self.code_row)
+
+        if rows_in(self.page_break_trigger - self.y) < 1:
+            self.add_page()
+        first = max(rows_in(self.page_break_trigger - self.y), 1)
+        per_page = max(rows_in(self.page_break_trigger - self.t_margin), 1)
+        self.set_fill_color(*self.colors['highlight'])
+        number_op = self.theme.text_ops['comment']
+        for page, chunk in enumerate(page_chunks(rows, first, per_page)):
+            if page:
+                self.add_page()
+            self.rect(self.l_margin, self.y, width, len(chunk) * self.code_row + 2 * self.code_padding, 'F')
+            self.set_y(self.y + self.code_padding)
+            for number, digits, runs in chunk:
+                if number:
+                    self._flush_buffer(f'{number:>{digits}} ', number_op)
+                elif digits:
+                    self.set_x(self.x + (digits + 1) * char_width)  # Continuation of a wrapped line
+                self._highlight_line(runs)
+                self.ln(self.code_row)
+            self.set_y(self.y + self.code_padding)
+        self.ln(8)
+
+    def code_files(self, patterns, line_numbers=True):
+        """Draws a listing of every file matching paths or glob patterns.
+
+        Each file gets a sub-heading with its path. Matches of one glob are
+        taken in sorted order.
+        """
+        for path in expand_paths(patterns):
+            self.sub_heading(path)
+            self.code_listing(path, line_numbers)
+
+    def _listing_rows(self, lines, width, char_width, line_numbers=False):
+        """Yields (line number or None, gutter digits, runs) for each row of highlighted lines.
+
+        With line_numbers the gutter holds LISTING_NUMBER_DIGITS digits and
+        a space, and widens from the first line whose number needs more, so
+        streamed lines need not be counted first. Rows are wrapped to the
+        width that is left.
+        """
+        digits = 0
+        max_chars = None
+        for number, runs in enumerate(lines, 1):
+            if max_chars is None or line_numbers and len(str(number)) > digits:
+                digits = max(len(str(number)), LISTING_NUMBER_DIGITS) if line_numbers else 0
+                gutter = (digits + 1) * char_width if line_numbers else 0
+                # At least one character per row, however large the font
+                max_chars = max(int((width - gutter - 2 * self.c_margin) / char_width), 1)
+            for i, row in enumerate(wrap_runs([runs], max_chars)):
+                yield (number if line_numbers and not i else None), digits, row
+
+    def _get_runs(self, code):
+        return highlight_cache.get_runs(code, guide_highlighter, self.theme.text_ops,
+                                        self.font_size_pt)
+
+    def _syntax_highlight(self, rows):
+        for runs in rows:
+            self._highlight_line(runs)
+            self.ln(self.code_row)
+
+    def _highlight_line(self, runs):
+        for op, text in runs:
+            self._flush_buffer(text, op)
+
+    def _flush_buffer(self, text, op):
+        if text:
+            apply_text_op(self, op)
+            self.cell(self.get_string_width(text), self.code_row, text)
+
+    def _putresources(self):
+        super()._putresources()
+        if self.outline:
+            self._putoutline()
+
+    def _putoutline(self):
+        # Flat outline: one root object followed by one item per bookmark
+        root = self.n + 1
+        count = len(self.outline)
+        self.outline_root = root
+        self._newobj()
+        self._out(f'<</Type /Outlines /First {root + 1} 0 R /Last {root + count} 0 R /Count {count}>>')
+        self._out('endobj')
+        for i, (title, page, y) in enumerate(self.outline):
+            links = f'/Parent {root} 0 R'
+            if i > 0:
+                links += f' /Prev {self.n} 0 R'
+            if i < count - 1:
+                links += f' /Next {self.n + 2} 0 R'
+            self._newobj()
+            # Page n is object 1 + 2n, as in FPDF._putpages
+            self._out(f'<</Title {self._outline_title(title)} {links} '
+                      f'/Dest [{1 + 2 * page} 0 R /XYZ 0 {(self.h - y) * self.k:.2f} null]>>')
+            self._out('endobj')
+
+    def _outline_title(self, title):
+        try:
+            title.encode('latin1')
+        except UnicodeEncodeError:  # Only possible with unicode fonts
+            title = '\xfe\xff' + title.encode('utf-16-be').decode('latin1')
+        return self._textstring(title)
+
+    def _putcatalog(self):
+        super()._putcatalog()
+        if self.outline:
+            self._out(f'/Outlines {self.outline_root} 0 R')
+            self._out('/PageMode /UseOutlines')
+
+
+class VSCodePDF(CachedWidthMixin, StreamingPDFMixin, OptimizedOutputMixin, FPDF):
+    def __init__(self):
+        super().__init__()
+        self.theme = get_theme('vscode')
+        self.colors = self.theme.colors
+
+    def add_vscode_codeblock(self, code, lang='python'):
+        self.set_font('Courier', '', 10)
+        self.code_row, padding = code_spacing(self.font_size)
+        self.set_draw_color(*self.colors['background'])
+        self.set_line_width(0.5)
+        self.set_fill_color(*self.colors['background'])
+        lines = self._get_runs(code)
+        width = self.w - self.l_margin - self.r_margin
+        rows = wrap_runs(lines, max(int((width - 8 - 2 * self.c_margin) / self.get_string_width(' ')), 1))
+
+        # Measure the block once, then give each page's part its own background
+        new_page, chunks = split_rows(len(rows), self.code_row, padding,
+                                      self.page_break_trigger - self.y,
+                                      self.page_break_trigger - self.t_margin)
+        if new_page:
+            self.add_page()
+        start = 0
+        for number, count in enumerate(chunks):
+            if number:
+                self.add_page()
+            self.rect(self.l_margin, self.y, width, count * self.code_row + 2 * padding, 'DF')
+            self.set_y(self.y + padding)
+            for runs in rows[start:start + count]:
+                self._add_vscode_line(runs)
+            self.set_y(self.y + padding)
+            start += count
+        self.ln(3)
+
+    def _get_runs(self, code):
+        return highlight_cache.get_runs(code, vscode_highlighter, self.theme.text_ops,
+                                        self.font_size_pt)
+
+    def _add_vscode_line(self, runs):
+        self.set_x(self.l_margin + 4)  # Code content is indented inside the background
+        for op, text in runs:
+            apply_text_op(self, op)
+            self.cell(self.get_string_width(text), self.code_row, text)
+        self.ln(self.code_row)
+
+
+def add_code_block(pdf, code, indent=4):
+    pdf.set_font("Courier", size=10)
+    left_margin = pdf.l_margin
+    pdf.set_left_margin(left_margin + indent)  # Wrapped lines keep the indentation
+    # Courier is monospace, so a line's width is its length times one advance.
+    # Lines that clearly fit are drawn one cell per run, exactly as write()
+    # would draw them; the rest go through write(), which wraps them.
+    advance = fixed_advance(pdf.current_font)
+    limit = (pdf.w - pdf.r_margin - pdf.l_margin - 2 * pdf.c_margin) * 1000.0 / pdf.font_size - 1
+    for runs in highlight_cache.get_runs(code, guide_highlighter, code_block_theme.text_ops,
+                                         pdf.font_size_pt):
+        pdf.set_x(pdf.l_margin)
+        line = ''.join(text for _, text in runs)
+        fits = advance is not None and len(line) * advance <= limit and '\r' not in line
+        for op, text in runs:
+            apply_text_op(pdf, op)
+            if fits:
+                pdf.cell(len(text) * advance / 1000.0 * pdf.font_size, 5, text)
+            else:
+                pdf.write(5, text)
+        pdf.ln(5)
+    pdf.set_left_margin(left_margin)
+    pdf.ln(3)
+    pdf.set_font("Arial", size=12)
+    pdf.set_text_color(0, 0, 0)  # Reset to black
@@ -0,0 +1,205 @@
+"""Serves guide PDFs on demand, rendering each distinct request once.
+
+Usage: python guide_service.py [--host HOST] [--port PORT] [--jobs N] [--cache-mb MB]
+
+Then fetch e.g.
+    http://127.0.0.1:8000/guide.pdf?guide=python_comprehensive_guide.md&sections=1,2&theme=vscode
+Query parameters are the build spec keys (see build_guides.py): guide (a file
+in guides/), sections, theme, code_font_size, unicode_fonts, optimize and
+line_breaks.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from urllib.parse import parse_qs, urlsplit
+
+from build_guides import make_pdf, spec_guide
+from guide_model import render_guide
+from pdf_optimize import LEVELS
+from prose import LINE_BREAKERS
+from themes import THEMES
+
+GUIDES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "guides")
+CODE_FONT_SIZES = range(4, 49)  # Accepted code_font_size values, in points
+
+
+def render_pdf(spec):
+    """Renders a spec to PDF bytes; runs in a worker process."""
+    pdf = render_guide(spec_guide(spec), partial(make_pdf, spec))
+    return pdf.output(dest='S').encode('latin1')
+
+
+def request_key(spec):
+    """Identifies a request: the spec plus the guide file's stat fingerprint."""
+    stat = os.stat(spec['guide'])
+    return json.dumps(spec, sort_keys=True), stat.st_size, stat.st_mtime_ns
+
+
+class GuideService:
+    """Renders guides in a process pool behind a coalescing LRU cache.
+
+    Concurrent requests for the same spec share one render, and finished
+    PDFs are kept, most recently used first, up to max_bytes in total.
+    """
+
+    def __init__(self, max_bytes=64 << 20, jobs=None):
+        self.max_bytes = max_bytes
+        self.jobs = jobs
+        self.pool = self._new_pool()
+        self.cache = OrderedDict()  # Request key -> PDF bytes
+        self.cache_bytes = 0
+        self.pending = {}           # Request key -> future of a running render
+        self.stats = {'renders': 0, 'hits': 0, 'coalesced': 0}
+
+    def _new_pool(self):
+        # Spawned, not forked: a forked worker would inherit the open client
+        # sockets and keep those connections from ever closing
+        return ProcessPoolExecutor(max_workers=self.jobs,
+                                   mp_context=multiprocessing.get_context('spawn'))
+
+    def _replace_pool(self, broken):
+        """Swaps in a fresh pool after a worker died; the old one takes no more work."""
+        if self.pool is broken:
+            broken.shutdown(wait=False)
+            self.pool = self._new_pool()
+
+    async def get(self, spec):
+        key = request_key(spec)
+        data = self.cache.get(key)
+        if data is not None:
+            self.cache.move_to_end(key)
+            self.stats['hits'] += 1
+            return data
+        future = self.pending.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+        else:
+            loop = asyncio.get_running_loop()
+            try:
+                future = loop.run_in_executor(self.pool, render_pdf, spec)
+            except BrokenProcessPool:
+                self._replace_pool(self.pool)
+                future = loop.run_in_executor(self.pool, render_pdf, spec)
+            future.pool = self.pool
+            future.add_done_callback(partial(self._finished, key))
+            self.pending[key] = future
+            self.stats['renders'] += 1
+        # Shielded, so a client that goes away does not cancel the others' render
+        try:
+            return await asyncio.shield(future)
+        except BrokenProcessPool:
+            self._replace_pool(future.pool)  # This request fails; later ones get a new pool
+            raise
+
+    def _finished(self, key, future):
+        del self.pending[key]
+        if future.cancelled() or future.exception() is not None:
+            return
+        data = future.result()
+        if len(data) > self.max_bytes:
+            return
+        self.cache[key] = data
+        self.cache_bytes += len(data)
+        while self.cache_bytes > self.max_bytes:
+            _, evicted = self.cache.popitem(last=False)
+            self.cache_bytes -= len(evicted)
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def query_spec(query):
+    """Turns URL query parameters into a build spec, rejecting bad values."""
+    params = {name: values[-1] for name, values in parse_qs(query).items()}
+    name = params.get('guide', 'python_comprehensive_guide.md')
+    if os.path.basename(name) != name:
+        raise ValueError("guide must be a file name in guides/")
+    spec = {'guide': os.path.join(GUIDES_DIR, name)}
+    if 'sections' in params:
+        spec['sections'] = [int(number) for number in params['sections'].split(',')]
+        if min(spec['sections']) < 1:
+            raise ValueError("sections are numbered from 1")
+    if 'theme' in params:
+        if params['theme'] not in THEMES:
+            raise ValueError(f"unknown theme {params['theme']}")
+        spec['theme'] = params['theme']
+    if 'code_font_size' in params:
+        spec['code_font_size'] = int(params['code_font_size'])
+        if spec['code_font_size'] not in CODE_FONT_SIZES:
+            raise ValueError(f"code_font_size must be from {CODE_FONT_SIZES.start} "
+                             f"to {CODE_FONT_SIZES.stop - 1}")
+    if params.get('unicode_fonts') in ('1', 'true'):
+        spec['unicode_fonts'] = True
+    if 'optimize' in params:
+        if params['optimize'] not in LEVELS:
+            raise ValueError(f"unknown optimize level {params['optimize']}")
+        spec['optimize'] = params['optimize']
+    if 'line_breaks' in params:
+        if params['line_breaks'] not in LINE_BREAKERS:
+            raise ValueError(f"unknown line_breaks {params['line_breaks']}")
+        spec['line_breaks'] = params['line_breaks']
+    return spec
+
+
+async def handle(service, reader, writer):
+    """Answers one HTTP/1.0-style GET request; enough for local testing."""
+    try:
+        request = await reader.readline()
+        while (await reader.readline()).strip():
+            pass  # Headers are not needed
+        try:
+            method, target, _ = request.decode('latin1').split()
+            url = urlsplit(target)
+            if method != 'GET' or url.path != '/guide.pdf':
+                status, body, kind = '404 Not Found', b'Not found\n', 'text/plain'
+            else:
+                body = await service.get(query_spec(url.query))
+                status, kind = '200 OK', 'application/pdf'
+        except (ValueError, IndexError) as e:
+            status, body, kind = '400 Bad Request', f'{e}\n'.encode(), 'text/plain'
+        except FileNotFoundError:
+            status, body, kind = '404 Not Found', b'No such guide\n', 'text/plain'
+        except Exception as e:  # A render failed; report it and keep serving
+            status, body, kind = '500 Internal Server Error', f'{e!r}\n'.encode(), 'text/plain'
+        writer.write(f'HTTP/1.1 {status}\r\nContent-Type: {kind}\r\n'
+                     f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode())
+        writer.write(body)
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(host='127.0.0.1', port=8000, jobs=None, cache_mb=64):
+    service = GuideService(cache_mb << 20, jobs)
+    server = await asyncio.start_server(partial(handle, service), host, port)
+    print(f"Serving guides on http://{host}:{port}/guide.pdf (Ctrl+C to stop)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve guide PDFs on demand.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--jobs', type=int, default=None,
+                        help="worker processes (default: one per CPU core)")
+    parser.add_argument('--cache-mb', type=int, default=64,
+                        help="memory for finished PDFs (default: 64)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.jobs, args.cache_mb))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+
+from file_export import write_file
+
+# Keywords highlighted by PythonGuidePDF (07_createPDF.py)
+GUIDE_KEYWORDS = ('def', 'class', 'if', 'else', 'elif', 'for',
+                  'while', 'return', 'import', 'from', 'as', 'try',
+                  'except', 'finally', 'with', 'async', 'await',
+                  'lambda', 'nonlocal', 'global', 'yield')
+
+# Keywords highlighted by VSCodePDF (06_createPDF.py)
+VSCODE_KEYWORDS = ('def', 'class', 'if', 'else', 'elif', 'for',
+                   'while', 'return', 'import', 'from', 'as', 'try',
+                   'except', 'finally', 'with', 'True', 'False', 'None')
+
+
+class Highlighter:
+    """Splits Python source lines into (kind, text) tokens.
+
+    Every line is scanned once by a single compiled regex, so the cost is
+    linear in the line length no matter how many keywords there are.
+    Token kinds are 'text', 'keyword', 'string' and 'comment', which match
+    the keys of the renderers' color dicts.
+    """
+
+    def __init__(self, keywords=GUIDE_KEYWORDS):
+        # Longest first so that e.g. 'elif' is never cut short by 'el...'
+        words = sorted(keywords, key=len, reverse=True)
+        self.pattern = re.compile(
+            r'(?P<comment>#.*)'
+            r'|(?P<string>"[^"]*"?|\'[^\']*\'?)'
+            r'|(?P<keyword>\b(?:' + '|'.join(map(re.escape, words)) + r')\b)'
+        )
+
+    def tokenize_line(self, line):
+        tokens = []
+        pos = 0
+        for match in self.pattern.finditer(line):
+            start = match.start()
+            if start > pos:
+                tokens.append(('text', line[pos:start]))
+            tokens.append((match.lastgroup, match.group()))
+            pos = match.end()
+        if pos < len(line):
+            tokens.append(('text', line[pos:]))
+        return tokens
+
+    def tokenize(self, code):
+        return [self.tokenize_line(line) for line in code.split('\n')]
+
+    def key(self):
+        return self.pattern.pattern
+
+
+def color_runs(tokens, colors):
+    """Maps tokens to colors and merges neighbours into (color, text) runs.
+
+    A color is whatever colors maps the token kinds to: an RGB tuple or a
+    compiled PDF operator string from themes.CompiledTheme.text_ops.
+
+    Adjacent tokens with the same color become one run, and whitespace-only
+    tokens join whichever run they touch, because their color is invisible.
+    Each run is one FPDF draw call.
+    """
+    runs = []
+    for kind, text in tokens:
+        color = colors[kind]
+        if runs:
+            last_color, last_text = runs[-1]
+            if last_color == color or text.isspace():
+                runs[-1] = (last_color, last_text + text)
+                continue
+            if last_text.isspace():
+                runs[-1] = (color, last_text + text)
+                continue
+        runs.append((color, text))
+    return runs
+
+
+def highlight_lines(lines, highlighter, colors):
+    """Lazily turns source lines (newlines included or not) into color runs."""
+    for line in lines:
+        yield color_runs(highlighter.tokenize_line(line.rstrip('\r\n')), colors)
+
+
+# Compiled once per process and shared by every generator
+guide_highlighter = Highlighter(GUIDE_KEYWORDS)
+vscode_highlighter = Highlighter(VSCODE_KEYWORDS)
+
+
+class HighlightCache:
+    """Content-addressed cache of highlighted code blocks.
+
+    A block is keyed by a hash of its code, keyword set, colors and font
+    size, and stored as one list of color runs per line. Recent blocks are
+    kept in an in-memory LRU; if cache_dir is given they are also saved
+    there as JSON so repeat builds skip highlighting entirely.
+    """
+
+    def __init__(self, max_entries=256, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.entries = OrderedDict()
+
+    def get_runs(self, code, highlighter, colors, font_size):
+        key = hashlib.sha1(repr((code, highlighter.key(), sorted(colors.items()),
+                                 font_size)).encode()).hexdigest()
+        lines = self.entries.get(key)
+        if lines is not None:
+            self.entries.move_to_end(key)
+            return lines
+
+        lines = self._load(key)
+        if lines is None:
+            lines = [color_runs(tokens, colors) for tokens in highlighter.tokenize(code)]
+            self._save(key, lines)
+
+        self.entries[key] = lines
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return lines
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, key + '.json')) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # JSON turns RGB color tuples into lists
+        return [[(tuple(color) if isinstance(color, list) else color, text)
+                 for color, text in runs] for runs in stored]
+
+    def _save(self, key, lines):
+        if not self.cache_dir:
+            return
+        # Each process writes its own temporary file and renames it over the
+        # entry, so workers saving the same block never trip over each other.
+        # An entry that cannot be written is simply a miss next time.
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_file(os.path.join(self.cache_dir, key + '.json'), json.dumps(lines), fsync=False)
+        except OSError:
+            pass
+
+
+# Shared by every generator; set GUIDE_CACHE_DIR to keep results between runs
+highlight_cache = HighlightCache(cache_dir=os.environ.get('GUIDE_CACHE_DIR'))
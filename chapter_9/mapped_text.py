@@ -0,0 +1,62 @@
+import mmap
+import os
+import re
+from contextlib import contextmanager
+
+CHUNK_SIZE = 1 << 20
+
+
+@contextmanager
+def mapped(path):
+    """Maps a file read-only; an empty file, which cannot be mapped, gives b''."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+def iter_lines(path, encoding='utf-8'):
+    """Yields the lines of a file, read through a memory map.
+
+    Only the current line is copied out of the map, so files far larger
+    than memory can be fed to e.g. prose.render_prose a line at a time.
+    """
+    with mapped(path) as data:
+        if data:
+            for line in iter(data.readline, b''):
+                yield line.decode(encoding)
+
+
+def iter_chunks(path, size=CHUNK_SIZE):
+    """Yields a file's bytes in pieces of size bytes, read through a memory map.
+
+    The pieces can go straight to file_export.write_files as a file's content.
+    """
+    with mapped(path) as data:
+        for start in range(0, len(data), size):
+            yield data[start:start + size]
+
+
+def find_lines(path, pattern, encoding='utf-8'):
+    """Yields each line of a file that matches a regular expression, once.
+
+    The search runs over the mapped bytes, so only the matching lines are
+    decoded and copied; e.g. next(find_lines(path, r'^Name: Kishore'), None)
+    finds one user's record. pattern may be a str or bytes.
+    """
+    if isinstance(pattern, str):
+        pattern = pattern.encode(encoding)
+    regex = re.compile(pattern, re.MULTILINE)
+    with mapped(path) as data:
+        pos = 0
+        while pos <= len(data):
+            match = regex.search(data, pos)
+            if match is None:
+                return
+            start = data.rfind(b'\n', 0, match.start()) + 1
+            end = data.find(b'\n', match.end())
+            end = len(data) if end < 0 else end
+            yield data[start:end].rstrip(b'\r').decode(encoding)
+            pos = end + 1
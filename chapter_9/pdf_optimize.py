@@ -0,0 +1,251 @@
+import io
+import mmap
+import os
+import re
+import struct
+import zlib
+
+# Output optimization levels: name -> (zlib level, recompress streams that are
+# already Flate-compressed, pack objects into object streams and write a
+# cross-reference stream). 'fast' suits CI builds, 'small' release builds.
+LEVELS = {
+    'fast': (1, False, False),
+    'balanced': (6, False, True),
+    'small': (9, True, True),
+}
+
+OBJECTS_PER_STREAM = 200  # Objects packed into one object stream
+
+_object = re.compile(rb'(\d+) 0 obj\s*')
+_stream_start = re.compile(rb'>>\s*stream\r?\n')
+_length = re.compile(rb'/Length\s+(\d+)')
+
+
+def _find(data, word, start=0, end=None, last=False):
+    # mmap has find and rfind but no index and rindex
+    pos = (data.rfind if last else data.find)(word, start, len(data) if end is None else end)
+    if pos < 0:
+        raise ValueError(f'Not a PDF written by FPDF: no {word.decode()}')
+    return pos
+
+
+def _read_xref(data):
+    """Returns (object offsets by number, trailer dictionary) of a classic xref table."""
+    start = int(data[_find(data, b'startxref', last=True) + 9:].split()[0])
+    end = _find(data, b'trailer', start)
+    fields = data[start + 4:end].split()  # Skip 'xref'
+    offsets = {}
+    i = 0
+    while i < len(fields):
+        first, count = int(fields[i]), int(fields[i + 1])
+        for number in range(first, first + count):
+            entry = fields[i + 2 + 3 * (number - first):i + 5 + 3 * (number - first)]
+            if entry[2] == b'n':
+                offsets[number] = int(entry[0])
+        i += 2 + 3 * count
+    trailer = data[end + 7:_find(data, b'startxref', end)].strip()
+    return offsets, trailer
+
+
+def _read_object(data, offset):
+    """Returns (dictionary or body, stream data or None) of the object at offset."""
+    pos = _object.match(data, offset).end()
+    end = _find(data, b'endobj', pos)
+    stream = _stream_start.search(data, pos, end)
+    if stream is None:
+        return data[pos:end].rstrip(), None
+    dictionary = data[pos:stream.start() + 2]
+    length = _length.search(dictionary)
+    if length is None:
+        raise ValueError(f'Stream at offset {offset} has no direct /Length')
+    return dictionary, data[stream.end():stream.end() + int(length.group(1))]
+
+
+def _compress(dictionary, stream, level, recompress):
+    """Flate-compresses a stream, returning the new (dictionary, data)."""
+    filters = re.search(rb'/Filter\s*(/\w+|\[[^\]]*\])', dictionary)
+    if filters is None:
+        stream = zlib.compress(stream, level)
+        dictionary = dictionary[:-2].rstrip() + b' /Filter /FlateDecode>>'
+    elif recompress and filters.group(1) == b'/FlateDecode':
+        stream = zlib.compress(zlib.decompress(stream), level)
+    else:
+        return dictionary, stream
+    return _length.sub(b'/Length %d' % len(stream), dictionary, count=1), stream
+
+
+class _Writer:
+    def __init__(self, out):
+        self.out = out
+        self.offset = 0
+
+    def write(self, data):
+        self.out.write(data)
+        self.offset += len(data)
+
+    def write_object(self, number, dictionary, stream=None):
+        self.write(b'%d 0 obj\n' % number + dictionary)
+        if stream is not None:
+            self.write(b'\nstream\n')
+            self.write(stream)
+            self.write(b'\nendstream')
+        self.write(b'\nendobj\n')
+
+
+def optimize_to(data, out, level='balanced'):
+    """Writes an optimized copy of the PDF in data (bytes or mmap) to out.
+
+    Every stream gets Flate compression, and with the packing levels all
+    objects other than streams go into compressed object streams indexed
+    by a cross-reference stream (PDF 1.5), instead of being stored one by
+    one behind a plain-text xref table.
+    """
+    zlib_level, recompress, pack = LEVELS[level]
+    offsets, trailer = _read_xref(data)
+    writer = _Writer(out)
+    header = data[:_find(data, b'\n') + 1]
+    if pack and header < b'%PDF-1.5':
+        header = b'%PDF-1.5\n'
+    writer.write(header)
+
+    entries = {}  # Object number -> (type, field 2, field 3) for the xref
+    packed = []
+    next_number = max(offsets) + 1
+
+    def put_object_stream():
+        nonlocal next_number
+        number = next_number
+        next_number += 1
+        index = b' '.join(b'%d %d' % (n, o) for n, o in _packed_offsets(packed))
+        body = b'\n'.join(body for _, body in packed)
+        stream = zlib.compress(index + b'\n' + body, zlib_level)
+        for i, (n, _) in enumerate(packed):
+            entries[n] = (2, number, i)
+        entries[number] = (1, writer.offset, 0)
+        writer.write_object(number, b'<</Type /ObjStm /N %d /First %d /Filter /FlateDecode '
+                            b'/Length %d>>' % (len(packed), len(index) + 1, len(stream)), stream)
+        packed.clear()
+
+    for number in sorted(offsets):
+        dictionary, stream = _read_object(data, offsets[number])
+        if stream is not None:
+            dictionary, stream = _compress(dictionary, stream, zlib_level, recompress)
+            entries[number] = (1, writer.offset, 0)
+            writer.write_object(number, dictionary, stream)
+        elif pack:
+            packed.append((number, dictionary))
+            if len(packed) == OBJECTS_PER_STREAM:
+                put_object_stream()
+        else:
+            entries[number] = (1, writer.offset, 0)
+            writer.write_object(number, dictionary)
+    if packed:
+        put_object_stream()
+
+    references = b' '.join(re.findall(rb'/(?:Root|Info)\s+\d+\s+\d+\s+R', trailer))
+    if pack:
+        number = next_number
+        entries[number] = (1, writer.offset, 0)
+        rows = [struct.pack('>BIH', 0, 0, 65535)]
+        rows += [struct.pack('>BIH', *entries.get(n, (0, 0, 0))) for n in range(1, number + 1)]
+        stream = zlib.compress(b''.join(rows), zlib_level)
+        xref = writer.offset
+        writer.write_object(number, b'<</Type /XRef /Size %d /W [1 4 2] %s /Filter /FlateDecode '
+                            b'/Length %d>>' % (number + 1, references, len(stream)), stream)
+    else:
+        size = next_number
+        xref = writer.offset
+        writer.write(b'xref\n0 %d\n0000000000 65535 f \n' % size)
+        for n in range(1, size):
+            writer.write(b'%010d 00000 n \n' % entries[n][1] if n in entries
+                         else b'0000000000 65535 f \n')
+        writer.write(b'trailer\n<</Size %d %s>>\n' % (size, references))
+    writer.write(b'startxref\n%d\n%%%%EOF\n' % xref)
+
+
+def _packed_offsets(packed):
+    """(number, offset from /First) of every object in an object stream."""
+    offset = 0
+    for number, body in packed:
+        yield number, offset
+        offset += len(body) + 1  # Bodies are separated by one newline
+
+
+def optimize_pdf(data, level='balanced'):
+    """Returns an optimized copy of the PDF in the bytes data."""
+    out = io.BytesIO()
+    optimize_to(data, out, level)
+    return out.getvalue()
+
+
+def optimize_file(path, level='balanced'):
+    """Optimizes a PDF file in place, reading it through mmap."""
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            with open(tmp, 'wb') as out:
+                optimize_to(data, out, level)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _env_level():
+    # Checked on import, so a typo fails before anything is built
+    level = os.environ.get('GUIDE_OPTIMIZE') or None
+    if level is not None and level not in LEVELS:
+        raise ValueError(f"GUIDE_OPTIMIZE: unknown optimize level {level!r}, "
+                         f"expected one of {', '.join(sorted(LEVELS))}")
+    return level
+
+
+class OptimizedOutputMixin:
+    """Adds an optimization stage to output() and a cheaper output buffer.
+
+    Set optimize to one of LEVELS (or GUIDE_OPTIMIZE in the environment)
+    and output() runs the finished PDF through optimize_to before it is
+    written or returned. Independently of that, the document is collected
+    as a list of strings: FPDF grows one string with += and measures it
+    for every object, which takes time quadratic in the document size.
+    Mix in right before FPDF.
+    """
+
+    optimize = _env_level()
+
+    @property
+    def buffer(self):
+        if len(self.buffer_parts) > 1:
+            self.buffer_parts[:] = [''.join(self.buffer_parts)]
+        return self.buffer_parts[0] if self.buffer_parts else ''
+
+    @buffer.setter
+    def buffer(self, value):
+        self.buffer_parts = [value]
+        self.buffer_length = len(value)
+
+    def _out(self, s):
+        if isinstance(s, bytes):
+            s = s.decode('latin1')
+        elif not isinstance(s, str):
+            s = str(s)
+        if self.state == 2:
+            self.pages[self.page] += s + '\n'
+        else:
+            self.buffer_parts.append(s + '\n')
+            self.buffer_length += len(s) + 1
+
+    def _newobj(self):
+        self.n += 1
+        self.offsets[self.n] = self.buffer_length
+        self._out(str(self.n) + ' 0 obj')
+
+    def output(self, name='', dest=''):
+        if self.optimize and not getattr(self, 'optimized', False):
+            if self.state < 3:
+                self.close()
+            # FPDF's output() then sends the optimized document wherever dest says
+            self.buffer = optimize_pdf(self.buffer.encode('latin1'), self.optimize).decode('latin1')
+            self.optimized = True
+        return super().output(name, dest)
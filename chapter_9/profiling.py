@@ -0,0 +1,110 @@
+import json
+import time
+
+# PDF method -> pipeline stage it belongs to
+STAGES = {
+    '_get_runs': 'tokenize',
+    'get_string_width': 'measure',
+    'cell': 'draw',
+    'write': 'draw',
+    'multi_cell': 'draw',
+    'rect': 'draw',
+    'add_page': 'page_break',
+    'output': 'output',
+}
+
+
+class Profiler:
+    """Opt-in per-stage instrumentation for the PDF generator classes.
+
+    attach(pdf) wraps the stage methods listed in STAGES on that one
+    instance, plus start_section and header_section (to know the current
+    section, from its page break on) and _out (to count bytes emitted).
+    Instances that are never attached run the original methods untouched,
+    so profiling costs nothing when it is off.
+    Time spent in a stage called from within another stage (FPDF's write
+    calls cell, for example) is counted once, under the outer stage.
+    """
+
+    def __init__(self, trace=True):
+        self.trace = trace
+        self.stats = {}    # section -> stage -> {'seconds', 'calls', 'bytes'}
+        self.events = []   # Chrome trace events
+        self.section = '(front matter)'
+        self.stage = None
+        self.origin = time.perf_counter()
+
+    def attach(self, pdf):
+        self.section = '(front matter)'
+        for name, stage in STAGES.items():
+            if hasattr(pdf, name):
+                setattr(pdf, name, self._timed(getattr(pdf, name), stage))
+        for name in ('start_section', 'header_section'):
+            if hasattr(pdf, name):
+                setattr(pdf, name, self._sectioned(getattr(pdf, name)))
+        pdf._out = self._counted(pdf._out)
+        return pdf
+
+    def factory(self, make_pdf):
+        """Wraps a PDF factory (e.g. for render_guide) to attach every PDF it makes."""
+        return lambda: self.attach(make_pdf())
+
+    def _entry(self, stage):
+        stages = self.stats.setdefault(self.section, {})
+        if stage not in stages:
+            stages[stage] = {'seconds': 0.0, 'calls': 0, 'bytes': 0}
+        return stages[stage]
+
+    def _timed(self, method, stage):
+        def timed(*args, **kwargs):
+            if self.stage is not None:
+                self._entry(stage)['calls'] += 1
+                return method(*args, **kwargs)
+            self.stage = stage
+            if stage == 'output':
+                self.section = '(output)'
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                self.stage = None
+                entry = self._entry(stage)
+                entry['seconds'] += end - start
+                entry['calls'] += 1
+                if self.trace:
+                    self.events.append({'name': stage, 'cat': self.section, 'ph': 'X',
+                                        'ts': (start - self.origin) * 1e6,
+                                        'dur': (end - start) * 1e6, 'pid': 0, 'tid': 0})
+        return timed
+
+    def _sectioned(self, method):
+        def sectioned(title):
+            self.section = title
+            return method(title)
+        return sectioned
+
+    def _counted(self, out):
+        def counted(s):
+            size = len(s) if isinstance(s, (str, bytes)) else len(str(s))
+            self._entry(self.stage or 'other')['bytes'] += size + 1  # + newline
+            return out(s)
+        return counted
+
+    def totals(self):
+        totals = {}
+        for stages in self.stats.values():
+            for stage, entry in stages.items():
+                total = totals.setdefault(stage, {'seconds': 0.0, 'calls': 0, 'bytes': 0})
+                for key in total:
+                    total[key] += entry[key]
+        return totals
+
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({'totals': self.totals(), 'sections': self.stats}, f, indent=2)
+
+    def to_chrome_trace(self, path):
+        """Writes the events in Chrome trace format (chrome://tracing, Perfetto)."""
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
@@ -0,0 +1,240 @@
+import re
+from functools import lru_cache
+
+from guide_model import Code, Prose
+from text_metrics import char_widths, register_font, text_width
+from themes import apply_text_op
+
+# Lines that open an embedded code region ("Example:", "Example of a 'for' loop:")
+# and numbered headings ("4. Loops"), which end one
+EXAMPLE = re.compile(r'Example\b.*:\s*$')
+HEADING = re.compile(r'\d+\.\s')
+
+
+@lru_cache(maxsize=8192)
+def break_lines(text, font_name, font_size, wmax):
+    """Splits a paragraph into lines the way FPDF.multi_cell does.
+
+    Returns a tuple of (line, ws): ws is the justification word spacing of
+    a line that was broken at a space, or None for a line ended by a
+    newline, a break inside a word or the end of the text. Keyed by text,
+    font, size and width (in 1/1000 em), so a paragraph is measured once.
+    """
+    cw = char_widths(font_name)
+    s = text.replace('\r', '')
+    if s.endswith('\n'):
+        s = s[:-1]
+    lines = []
+    sep = -1
+    i = j = 0
+    l = ns = ls = 0
+    while i < len(s):
+        c = s[i]
+        if c == '\n':
+            lines.append((s[j:i], None))
+            i += 1
+            sep = -1
+            j = i
+            l = ns = 0
+            continue
+        if c == ' ':
+            sep = i
+            ls = l
+            ns += 1
+        l += cw.get(c, 0)
+        if l > wmax:
+            if sep == -1:
+                if i == j:
+                    i += 1
+                lines.append((s[j:i], None))
+            else:
+                ws = (wmax - ls) / 1000.0 * font_size / (ns - 1) if ns > 1 else 0
+                lines.append((s[j:sep], ws))
+                i = sep + 1
+            sep = -1
+            j = i
+            l = ns = 0
+        else:
+            i += 1
+    lines.append((s[j:i], None))
+    return tuple(lines)
+
+
+def _split_word(word, cw, wmax):
+    """Cuts a word wider than wmax into pieces that fit, as multi_cell would."""
+    pieces = []
+    start = width = 0
+    for i, c in enumerate(word):
+        width += cw.get(c, 0)
+        if width > wmax and i > start:
+            pieces.append(word[start:i])
+            start, width = i, cw.get(c, 0)
+    pieces.append(word[start:])
+    return pieces
+
+
+@lru_cache(maxsize=8192)
+def optimal_breaks(text, font_name, font_size, wmax):
+    """Splits a paragraph into lines that minimize the total raggedness.
+
+    A Knuth-Plass style alternative to break_lines, returning lines in the
+    same form. Instead of filling each line greedily, it picks the breaks
+    for which the sum of the squared free space of every line but the last
+    is smallest, so justified lines get evenly spaced words. A line holds
+    a bounded number of words, so the cost is linear in the word count.
+    The result only depends on the arguments, which also key the cache.
+    """
+    cw = char_widths(font_name)
+    space = cw.get(' ', 0)
+    s = text.replace('\r', '')
+    if s.endswith('\n'):
+        s = s[:-1]
+    lines = []
+    for segment in s.split('\n'):
+        # Tokens are words, or pieces of words too wide for a line, with
+        # whether a space separates them from the token before
+        tokens = []
+        for word in segment.split(' '):
+            width = text_width(font_name, word)
+            pieces = _split_word(word, cw, wmax) if width > wmax else [word]
+            for k, piece in enumerate(pieces):
+                tokens.append((piece, width if len(pieces) == 1 else text_width(font_name, piece),
+                               k == 0 and bool(tokens)))
+        n = len(tokens)
+        # best[j] = (cost, start of last line) of the best breaks of tokens[:j]
+        best = [(0.0, 0)] + [None] * n
+        for j in range(1, n + 1):
+            width = 0
+            for i in range(j - 1, -1, -1):
+                width += tokens[i][1] + (space if i < j - 1 and tokens[i + 1][2] else 0)
+                if width > wmax and i < j - 1:
+                    break
+                free = (wmax - width) / wmax if j < n else 0.0
+                cost = best[i][0] + free * free
+                if best[j] is None or cost < best[j][0]:
+                    best[j] = (cost, i)
+        ends = []
+        j = n
+        while j > 0:
+            ends.append(j)
+            j = best[j][1]
+        start = 0
+        for end in reversed(ends):
+            line = tokens[start][0]
+            width = tokens[start][1]
+            gaps = 0
+            for piece, piece_width, spaced in tokens[start + 1:end]:
+                line += ' ' + piece if spaced else piece
+                width += piece_width + (space if spaced else 0)
+                gaps += spaced
+            ws = None
+            if end < n and tokens[end][2]:  # Broken at a space: justified
+                ws = (wmax - width) / 1000.0 * font_size / gaps if gaps else 0
+            lines.append((line, ws))
+            start = end
+    return tuple(lines)
+
+
+# Line breakers by name, for draw_paragraph
+LINE_BREAKERS = {'greedy': break_lines, 'optimal': optimal_breaks}
+
+
+def draw_paragraph(pdf, text, h, align='J', line_breaks='greedy'):
+    """Draws text exactly as pdf.multi_cell(0, h, text, 0, align) would.
+
+    Line breaks come from break_lines, so a paragraph drawn again at the
+    same font and width is not measured again. With line_breaks='optimal'
+    they come from optimal_breaks instead. TTF fonts go through
+    multi_cell itself.
+    """
+    if pdf.unifontsubset:
+        pdf.multi_cell(0, h, text, 0, align)
+        return
+    font = pdf.current_font
+    register_font(font)
+    w = pdf.w - pdf.r_margin - pdf.x
+    wmax = (w - 2 * pdf.c_margin) * 1000.0 / pdf.font_size
+    for line, ws in LINE_BREAKERS[line_breaks](text, font['name'], pdf.font_size, wmax):
+        if ws is None:
+            if pdf.ws > 0:
+                pdf.ws = 0
+                pdf._out('0 Tw')
+        elif align == 'J':
+            pdf.ws = ws
+            pdf._out('%.3f Tw' % (ws * pdf.k))
+        pdf.cell(w, h, line, 0, 2, align)
+    pdf.x = pdf.l_margin
+
+
+def prose_blocks(lines, code_regions=True):
+    """Lazily splits prose into Prose paragraphs and embedded Code regions.
+
+    lines is a string or any iterable of lines, e.g. an open file.
+    Consecutive lines form one paragraph and every empty line becomes an
+    empty Prose block, so drawing the blocks in turn gives the same page as
+    one multi_cell over the whole text. With code_regions, the lines after
+    an "Example...:" line, up to the next numbered heading or example, are
+    yielded as one Code block.
+    """
+    if isinstance(lines, str):
+        lines = (lines[:-1] if lines.endswith('\n') else lines).split('\n')
+    paragraph = []
+    code = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if code is not None:
+            if not (HEADING.match(line) or EXAMPLE.match(line)):
+                code.append(line)
+                continue
+            yield from _code_region(code)
+            code = None
+        if not line:
+            if paragraph:
+                yield Prose('\n'.join(paragraph))
+                paragraph = []
+            yield Prose('')
+            continue
+        paragraph.append(line)
+        if code_regions and EXAMPLE.match(line):
+            yield Prose('\n'.join(paragraph))
+            paragraph = []
+            code = []
+    if code is not None:
+        yield from _code_region(code)
+    if paragraph:
+        yield Prose('\n'.join(paragraph))
+
+
+def _code_region(lines):
+    # Blank lines around the code stay part of the prose around it
+    start = 0
+    while start < len(lines) and not lines[start].strip():
+        start += 1
+    end = len(lines)
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    for _ in range(start):
+        yield Prose('')
+    if end > start:
+        yield Code('\n'.join(lines[start:end]))
+    for _ in range(len(lines) - end):
+        yield Prose('')
+
+
+def render_prose(pdf, content, h, code_renderer=None, align='J'):
+    """Draws long prose one paragraph at a time, like pdf.multi_cell(0, h, content).
+
+    content is a string or an iterable of lines and is never held in full.
+    With a code_renderer, e.g. guide_pdf.add_code_block, embedded example
+    code goes to it instead of being drawn as text; the prose font and
+    color are restored afterwards.
+    """
+    for block in prose_blocks(content, code_regions=code_renderer is not None):
+        if isinstance(block, Code):
+            family, style, size = pdf.font_family, pdf.font_style, pdf.font_size_pt
+            color = pdf.text_color
+            code_renderer(pdf, block.code)
+            pdf.set_font(family, style, size)
+            apply_text_op(pdf, color)
+        else:
+            draw_paragraph(pdf, block.text, h, align)
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from file_export import write_file
+
+# Modules whose code decides how a section is laid out; editing any of them
+# invalidates every cached section
+RENDERER_SOURCES = ('code_layout.py', 'fonts.py', 'guide_model.py', 'guide_pdf.py',
+                    'highlighter.py', 'prose.py', 'streaming_pdf.py', 'text_metrics.py',
+                    'themes.py')
+
+
+def renderer_version():
+    digest = hashlib.sha1()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in RENDERER_SOURCES:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class SectionCache:
+    """On-disk cache of laid-out sections for incremental builds.
+
+    A section's (pages, outline) from layout_sections is stored under a
+    fingerprint of the section content, its style inputs (theme colors,
+    code font size) and the renderer source. Sections do not depend on
+    where they land in the guide, so an unchanged section is reused even
+    when the sections before it grew or shrank; merge_chapters then
+    renumbers the table of contents and outline. The most recently used
+    max_entries sections are also kept in memory for long-lived processes;
+    without cache_dir only there.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=256):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.version = renderer_version()
+        self.memory = OrderedDict()
+
+    def key(self, section, style):
+        return hashlib.sha1(repr((self.version, style, section)).encode()).hexdigest()
+
+    def _remember(self, key, chapter):
+        self.memory[key] = chapter
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def load(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        if not self.cache_dir:
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, key + '.json'), encoding='latin1') as f:
+                pages, outline = json.load(f)
+        except (OSError, ValueError):
+            return None
+        chapter = pages, [tuple(entry) for entry in outline]
+        self._remember(key, chapter)
+        return chapter
+
+    def save(self, key, chapter):
+        self._remember(key, chapter)
+        if not self.cache_dir:
+            return
+        # A temporary file per process, so builds saving the same section in
+        # parallel do not collide; an entry that cannot be written is a miss
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            write_file(os.path.join(self.cache_dir, key + '.json'), json.dumps(chapter),
+                       fsync=False)
+        except OSError:
+            pass
@@ -0,0 +1,93 @@
+import glob
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from highlighter import highlight_lines
+from mapped_text import iter_lines
+
+MEMORY_LIMIT = 1 << 20  # Files up to this size also keep their runs in memory
+
+
+def expand_paths(patterns):
+    """Returns the files matching paths or glob patterns, in order, each once."""
+    if isinstance(patterns, str):
+        patterns = [patterns]
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        matches = [path for path in matches if os.path.isfile(path)]  # Not directories
+        if not matches:
+            raise FileNotFoundError(f'No source files match {pattern}')
+        paths.extend(path for path in matches if path not in paths)
+    return paths
+
+
+class SourceCache:
+    """Highlighted source files, keyed by their stat fingerprint.
+
+    A file is identified by its path, size and modification time, so an
+    unchanged file is neither read nor highlighted again. Runs of the
+    max_entries most recently used small files are kept in memory and, if
+    cache_dir is given, all are saved there as JSON lines (one line of runs
+    per source line) that later builds read back a line at a time.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=64):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get_runs(self, path, highlighter, colors):
+        """Yields one list of (color, text) runs per line of the file."""
+        stat = os.stat(path)
+        key = hashlib.sha1(repr((os.path.abspath(path), stat.st_size, stat.st_mtime_ns,
+                                 highlighter.key(), sorted(colors.items()))).encode()).hexdigest()
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return iter(self.entries[key])
+        stored = os.path.join(self.cache_dir, key + '.jsonl') if self.cache_dir else None
+        if stored and os.path.exists(stored):
+            return self._load(stored)
+        lines = highlight_lines(iter_lines(path), highlighter, colors)
+        if stat.st_size <= MEMORY_LIMIT:
+            lines = self.entries[key] = list(lines)
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        if stored:
+            return self._save(stored, lines)
+        return iter(lines)
+
+    def _load(self, stored):
+        with open(stored) as f:
+            for line in f:
+                yield json.loads(line)
+
+    def _save(self, stored, lines):
+        """Passes lines through while writing them to the cache file."""
+        # One temporary file per process, so parallel builds listing the same
+        # file never collide; the last complete one renamed into place wins
+        tmp = f'{stored}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            f = open(tmp, 'w')
+        except OSError:
+            yield from lines  # Not cached, so a miss next time
+            return
+        complete = False
+        try:
+            with f:
+                for runs in lines:
+                    f.write(json.dumps(runs) + '\n')
+                    yield runs
+            complete = True
+        finally:
+            if complete:
+                os.replace(tmp, stored)  # Never leave a half-written entry
+            else:
+                os.remove(tmp)
+
+
+# Shared by every generator; set GUIDE_CACHE_DIR to keep results between runs
+source_cache = SourceCache(cache_dir=os.environ.get('GUIDE_CACHE_DIR'))
@@ -0,0 +1,176 @@
+import os
+import tempfile
+import zlib
+
+from pdf_optimize import optimize_file
+
+
+class PageSpool:
+    """Finished page content streams kept in a temporary file, not in memory."""
+
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.index = []  # (offset, length) of every page
+
+    def append(self, content):
+        data = content.encode('latin1')
+        self.file.seek(0, 2)
+        self.index.append((self.file.tell(), len(data)))
+        self.file.write(data)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __iter__(self):
+        for offset, length in self.index:
+            self.file.seek(offset)
+            yield self.file.read(length).decode('latin1')
+
+
+class StreamingPDFMixin:
+    """Lets an FPDF subclass hand finished pages off instead of keeping them.
+
+    After stream_to(name) every page is written to the file, together with
+    its page object, as soon as it ends; only the object offsets for the
+    xref table stay in memory, and output() just writes the fonts, outline,
+    catalog, xref and trailer. Pages are numbered as in FPDF (page n is
+    object 1 + 2n). Links and alias_nb_pages are not supported while
+    streaming. Mix in before FPDF.
+    """
+
+    page_sink = None  # Called with the content of every finished page
+    stream = None
+
+    def stream_to(self, name):
+        # Pages go to a temporary file that output() renames to name, so a
+        # failed build leaves the previous file at name as it was
+        self.stream_path = name
+        self.stream = open(f'{name}.{os.getpid()}.tmp', 'wb')
+        self.stream_offset = 0
+        self.page_sink = self._write_page
+        self._write('%PDF-' + self.pdf_version + '\n')
+
+    def spool_pages(self):
+        """Sends finished pages to a new PageSpool, which is returned."""
+        spool = PageSpool()
+        self.page_sink = spool.append
+        return spool
+
+    def finish_pages(self):
+        """Ends the open page, so that it also reaches the page sink."""
+        if self.state == 2:
+            self._endpage()
+
+    def append_page(self, content):
+        """Adds an already laid-out page after the current one."""
+        self.finish_pages()
+        self.page += 1
+        self.pages[self.page] = content
+        self.state = 2
+
+    def _endpage(self):
+        super()._endpage()
+        if self.page_sink:
+            self.page_sink(self.pages.pop(self.page))
+
+    def _write(self, s):
+        data = s.encode('latin1')
+        self.stream.write(data)
+        self.stream_offset += len(data)
+
+    def _write_page(self, content):
+        self.buffer = ''
+        self._newobj()
+        self._out('<</Type /Page')
+        self._out('/Parent 1 0 R')
+        if self.page in self.orientation_changes:
+            w_pt, h_pt = self._default_page_size()
+            self._out('/MediaBox [0 0 %.2f %.2f]' % (h_pt, w_pt))
+        self._out('/Resources 2 0 R')
+        if self.pdf_version > '1.3':
+            self._out('/Group <</Type /Group /S /Transparency /CS /DeviceRGB>>')
+        self._out('/Contents ' + str(self.n + 1) + ' 0 R>>')
+        self._out('endobj')
+        if self.compress:
+            content = zlib.compress(content.encode('latin1')).decode('latin1')
+            stream_filter = '/Filter /FlateDecode '
+        else:
+            stream_filter = ''
+        self._newobj()
+        self._out('<<' + stream_filter + '/Length ' + str(len(content)) + '>>')
+        self._putstream(content)
+        self._out('endobj')
+        self._write(self.buffer)
+        self.buffer = ''
+
+    def _default_page_size(self):
+        if self.def_orientation == 'P':
+            return self.fw_pt, self.fh_pt
+        return self.fh_pt, self.fw_pt
+
+    def _newobj(self):
+        super()._newobj()
+        if self.stream:
+            self.offsets[self.n] += self.stream_offset
+
+    def _enddoc(self):
+        if not self.stream:
+            return super()._enddoc()
+        # The pages are already in the file; write everything that follows them
+        self.buffer = ''
+        w_pt, h_pt = self._default_page_size()
+        self.offsets[1] = self.stream_offset
+        self._out('1 0 obj')
+        self._out('<</Type /Pages')
+        self._out('/Kids [' + ''.join(str(1 + 2 * n) + ' 0 R ' for n in range(1, self.page + 1)) + ']')
+        self._out('/Count ' + str(self.page))
+        self._out('/MediaBox [0 0 %.2f %.2f]' % (w_pt, h_pt))
+        self._out('>>')
+        self._out('endobj')
+        self._putresources()
+        self.offsets[2] += self.stream_offset  # FPDF records it relative to the buffer
+        self._newobj()
+        self._out('<<')
+        self._putinfo()
+        self._out('>>')
+        self._out('endobj')
+        self._newobj()
+        self._out('<<')
+        self._putcatalog()
+        self._out('>>')
+        self._out('endobj')
+        xref = self.stream_offset + len(self.buffer)
+        self._out('xref')
+        self._out('0 ' + str(self.n + 1))
+        self._out('0000000000 65535 f ')
+        for i in range(1, self.n + 1):
+            self._out('%010d 00000 n ' % self.offsets[i])
+        self._out('trailer')
+        self._out('<<')
+        self._puttrailer()
+        self._out('>>')
+        self._out('startxref')
+        self._out(xref)
+        self._out('%%EOF')
+        self.state = 3
+        self._write(self.buffer)
+        self.buffer = ''
+
+    def output(self, name='', dest=''):
+        if not self.stream:
+            return super().output(name, dest)
+        if dest.upper() not in ('', 'F'):
+            self.error(f"A streamed document is written to {self.stream_path}; "
+                       f"dest='{dest}' is not supported")
+        try:
+            self.close()
+            self.stream.close()
+            if getattr(self, 'optimize', None):  # See OptimizedOutputMixin
+                optimize_file(self.stream.name, self.optimize)
+            os.replace(self.stream.name, self.stream_path)
+        except BaseException:
+            self.stream.close()
+            if os.path.exists(self.stream.name):
+                os.remove(self.stream.name)
+            raise
+        return ''
@@ -0,0 +1,58 @@
+"""Checks the guide inputs: Markdown parsing, code wrapping and source file patterns.
+
+Run with: python -m pytest chapter_9
+"""
+import os
+
+import pytest
+
+from code_layout import wrap_runs
+from guide_model import Code, Heading, Prose, parse_markdown
+from source_files import expand_paths
+
+
+def test_parse_markdown():
+    guide = parse_markdown('# Title\nSub\ntitle\n\n## One\nSome\ntext\n### Part\n```\nx = 1\n```\n')
+    assert (guide.title, guide.subtitle) == ('Title', 'Sub title')
+    assert [section.title for section in guide.sections] == ['One']
+    assert guide.sections[0].blocks == (Prose('Some text'), Heading('Part'), Code('x = 1'))
+
+
+@pytest.mark.parametrize('text, message', [
+    ('# Title\n### Part\n## One\n', 'line 2: "### " heading before the first "## " section'),
+    ('# Title\n\n```\nx = 1\n```\n', 'line 3: code block before the first "## " section'),
+    ('## One\ntext\n```\nx = 1\n', 'line 3: code block is never closed'),
+])
+def test_parse_markdown_rejects_misplaced_blocks(text, message):
+    with pytest.raises(ValueError) as error:
+        parse_markdown(text)
+    assert str(error.value) == message
+
+
+@pytest.mark.parametrize('max_chars', [0, -1])
+def test_wrap_runs_needs_room_for_a_character(max_chars):
+    with pytest.raises(ValueError):
+        wrap_runs([[('0 g', 'x = 1')]], max_chars)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    for name in ('a.py', 'b.txt', os.path.join('pkg', 'c.py'), os.path.join('pkg', 'sub', 'd.py')):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('pass\n')
+    return tmp_path
+
+
+def test_expand_paths_skips_directories(sources):
+    assert expand_paths(str(sources / '*')) == [str(sources / 'a.py'), str(sources / 'b.txt')]
+
+
+def test_expand_paths_recursive_glob(sources):
+    assert expand_paths([str(sources / 'pkg' / '**'), str(sources / '**' / '*.py')]) == [
+        str(sources / 'pkg' / 'c.py'), str(sources / 'pkg' / 'sub' / 'd.py'), str(sources / 'a.py')]
+
+
+def test_expand_paths_rejects_a_lone_directory(sources):
+    with pytest.raises(FileNotFoundError):
+        expand_paths(str(sources / 'pkg'))
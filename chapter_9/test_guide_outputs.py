@@ -0,0 +1,83 @@
+"""Builds the sample guide in every output mode and checks the PDFs agree.
+
+Run with: python -m pytest chapter_9
+"""
+import os
+from functools import partial
+
+import pytest
+
+from build_guides import make_pdf, render_chapter, spec_guide
+from guide_model import merge_chapters, render_guide
+from pdf_optimize import LEVELS
+
+pypdf = pytest.importorskip('pypdf')
+
+GUIDE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                     'guides', 'python_comprehensive_guide.md')
+
+
+def build(tmp_path, name, stream=False, **options):
+    spec = dict(options, guide=GUIDE)
+    path = str(tmp_path / name)
+    pdf = render_guide(spec_guide(spec), partial(make_pdf, spec), path if stream else None)
+    pdf.output(path)
+    return path
+
+
+def summary(path):
+    """(page count, [(title, page number)] of the outline) of a PDF, parsed strictly."""
+    reader = pypdf.PdfReader(path, strict=True)
+    outline = [(item.title, reader.get_destination_page_number(item))
+               for item in reader.outline]
+    for page in reader.pages:
+        page.extract_text()  # Every content stream must decode
+    return len(reader.pages), outline
+
+
+@pytest.fixture(scope='module')
+def plain(tmp_path_factory):
+    return summary(build(tmp_path_factory.mktemp('plain'), 'plain.pdf'))
+
+
+def test_plain_build_has_an_outline(plain):
+    pages, outline = plain
+    sections = spec_guide({'guide': GUIDE}).sections
+    assert pages > len(sections)
+    assert [title for title, _ in outline] == (['Table of Contents']
+                                               + [section.title for section in sections])
+
+
+def test_streamed_build_matches_plain(tmp_path, plain):
+    assert summary(build(tmp_path, 'streamed.pdf', stream=True)) == plain
+
+
+@pytest.mark.parametrize('level', sorted(LEVELS))
+def test_optimized_build_matches_plain(tmp_path, plain, level):
+    path = build(tmp_path, 'optimized.pdf', optimize=level)
+    assert summary(path) == plain
+    assert os.path.getsize(path) < os.path.getsize(build(tmp_path, 'plain.pdf'))
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_merged_chapters_match_plain(tmp_path, plain, stream):
+    spec = {'guide': GUIDE}
+    guide = spec_guide(spec)
+    path = str(tmp_path / 'merged.pdf')
+    pdf = merge_chapters(guide, [render_chapter(spec, section) for section in guide.sections],
+                         partial(make_pdf, spec), path if stream else None)
+    pdf.output(path)
+    assert summary(path) == plain
+
+
+@pytest.mark.parametrize('level', sorted(LEVELS))
+def test_streamed_and_optimized_build_matches_plain(tmp_path, plain, level):
+    assert summary(build(tmp_path, 'both.pdf', stream=True, optimize=level)) == plain
+
+
+def test_failed_streamed_build_keeps_the_previous_file(tmp_path, plain):
+    path = build(tmp_path, 'guide.pdf', stream=True)
+    with pytest.raises(KeyError):  # Fails in output(), once every page was streamed
+        build(tmp_path, 'guide.pdf', stream=True, optimize='no such level')
+    assert summary(path) == plain
+    assert os.listdir(tmp_path) == ['guide.pdf']
@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+# Font name -> glyph advance (1/1000 em), or None for proportional fonts
+_fixed_advances = {}
+# (font name, size) -> advance of one glyph in user units (monospace only)
+_advance_tables = {}
+# Font name -> character width table of every core font measured so far
+_char_widths = {}
+
+
+def register_font(font):
+    """Makes a core font's character widths known to char_widths and text_width."""
+    _char_widths.setdefault(font['name'], font['cw'])
+
+
+def char_widths(name):
+    """Character width table (1/1000 em) of a registered font."""
+    return _char_widths[name]
+
+
+def fixed_advance(font):
+    """Glyph advance of a monospace core font in 1/1000 em, or None."""
+    name = font['name']
+    if name not in _fixed_advances:
+        widths = set(font['cw'].values())
+        _fixed_advances[name] = widths.pop() if len(widths) == 1 else None
+        register_font(font)
+    return _fixed_advances[name]
+
+
+@lru_cache(maxsize=16384)
+def text_width(name, text):
+    """Width of text in a registered font, in 1/1000 em, whatever the size.
+
+    Shared by get_string_width and the line breakers in prose, so every
+    distinct string or word is measured once.
+    """
+    cw = _char_widths[name]
+    return sum(cw.get(char, 0) for char in text)
+
+
+class CachedWidthMixin:
+    """Replaces FPDF.get_string_width with cached measurements.
+
+    Monospace fonts such as Courier are measured as character count times
+    a per-font/per-size advance computed once; proportional core fonts go
+    through an LRU cache. Mix in before FPDF: class MyPDF(CachedWidthMixin, FPDF).
+    """
+
+    def get_string_width(self, s):
+        if self.unifontsubset:  # TTF fonts keep FPDF's own measurement
+            return super().get_string_width(s)
+        font = self.current_font
+        key = (font['name'], self.font_size)
+        advance = _advance_tables.get(key)
+        if advance is None:
+            fixed = fixed_advance(font)
+            if fixed is None:
+                return text_width(font['name'], s) * self.font_size / 1000.0
+            advance = _advance_tables[key] = fixed * self.font_size / 1000.0
+        return len(s) * advance
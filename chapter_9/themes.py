@@ -0,0 +1,80 @@
+# Color themes for code blocks, selected with PythonGuidePDF(theme=...)
+THEMES = {
+    # Optimal readability color scheme (light theme)
+    'light': {
+        'background': (255, 255, 255),  # White
+        'text': (0, 0, 0),              # Black
+        'keyword': (0, 0, 255),         # Blue
+        'string': (0, 128, 0),          # Green
+        'comment': (128, 128, 128),     # Gray
+        'function': (255, 165, 0),      # Orange
+        'number': (139, 0, 139),        # Dark magenta
+        'operator': (128, 0, 128),      # Purple
+        'highlight': (255, 255, 200)    # Light yellow
+    },
+    # VS Code dark theme, as used by 06_createPDF.py
+    'vscode': {
+        'background': (40, 44, 52),     # VS Code dark theme bg
+        'text': (212, 212, 212),        # Default text color
+        'keyword': (86, 156, 214),      # Blue for keywords
+        'string': (152, 195, 121),      # Green for strings
+        'comment': (106, 153, 85),      # Gray-green for comments
+        'function': (220, 220, 170),    # Yellow for functions
+        'number': (184, 215, 163),      # Light green for numbers
+        'operator': (197, 134, 192),    # Purple for operators
+        'highlight': (40, 44, 52)       # Code block background
+    }
+}
+
+
+# Code colors for add_code_block on a plain white page
+CODE_BLOCK_COLORS = {
+    'text': (0, 0, 128),       # Dark blue
+    'keyword': (0, 0, 255),    # Blue
+    'string': (0, 128, 0),     # Green
+    'comment': (128, 128, 128) # Gray
+}
+
+
+def text_color_op(color):
+    """The operator FPDF.set_text_color(*color) stores, formatted the same way."""
+    r, g, b = color
+    if r == 0 and g == 0 and b == 0:
+        return '%.3f g' % 0
+    return '%.3f %.3f %.3f rg' % (r / 255.0, g / 255.0, b / 255.0)
+
+
+def apply_text_op(pdf, op):
+    """Makes op (from text_color_op) pdf's text color, like set_text_color without formatting it."""
+    if op != pdf.text_color:
+        pdf.text_color = op
+        pdf.color_flag = pdf.fill_color != op
+
+
+class CompiledTheme:
+    """A color theme with its text colors turned into PDF operators.
+
+    colors keeps the RGB tuples (used for fills and backgrounds) and
+    text_ops maps every token kind to its ready-made 'rg' operator, so
+    renderers switch colors with apply_text_op instead of calling
+    set_text_color, which formats three floats every time.
+    """
+
+    def __init__(self, colors):
+        self.colors = colors
+        self.text_ops = {kind: text_color_op(color) for kind, color in colors.items()}
+
+
+# Theme name -> CompiledTheme, filled in on first use and shared by every renderer
+_compiled_themes = {}
+
+
+def get_theme(name):
+    theme = _compiled_themes.get(name)
+    if theme is None:
+        theme = _compiled_themes[name] = CompiledTheme(THEMES[name])
+    return theme
+
+
+# Compiled once per process for add_code_block
+code_block_theme = CompiledTheme(CODE_BLOCK_COLORS)